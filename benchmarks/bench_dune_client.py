@@ -0,0 +1,103 @@
+"""
+Per-call latency and calls/sec of main.py's Dune fetch, old path against new path.
+
+The old path is the original `get_latest_result`: a new blocking `httpx.Client` per
+call, so every call opens its own connection. The new path is
+`main.fetch_latest_result` on the shared pooled `httpx.AsyncClient` (the result cache
+is bypassed, so only the transport is compared). Both run against a local stub Dune
+server; `--latency` adds a per-request delay in the stub. The stub shares the
+process, so calls/sec is bounded by one CPU. Concurrency above
+DUNE_MAX_KEEPALIVE_CONNECTIONS (10) reopens the connections beyond that cap.
+
+    python benchmarks/bench_dune_client.py --calls 200 --concurrency 10 --rows 100
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import httpx
+
+os.environ.setdefault("DUNE_API_KEY", "benchmark")
+os.environ.setdefault("RADAR_SNAPSHOT_PATH", "")
+os.environ.setdefault("RADAR_REFRESH", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from stub_servers import StubDune, describe  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def old_get_latest_result(base_url: str, query_id: int, limit: int):
+    with httpx.Client() as client:
+        response = client.get(f"{base_url}/query/{query_id}/results", params={"limit": limit},
+                              headers=main.HEADERS, timeout=300)
+        response.raise_for_status()
+        data = response.json()
+    return data.get("result", {}).get("rows", [])
+
+
+async def run_old(base_url: str, calls: int, rows: int):
+    # The original tools were synchronous, so calls ran one after another
+    samples = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        call_started = time.perf_counter()
+        old_get_latest_result(base_url, main.RECENT_KOL_BUYS_QUERY_ID, rows)
+        samples.append(time.perf_counter() - call_started)
+    return samples, time.perf_counter() - started
+
+
+async def run_new(calls: int, concurrency: int, rows: int):
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        async with semaphore:
+            call_started = time.perf_counter()
+            await main.fetch_latest_result(main.RECENT_KOL_BUYS_QUERY_ID, rows)
+            samples.append(time.perf_counter() - call_started)
+
+    await main.fetch_latest_result(main.RECENT_KOL_BUYS_QUERY_ID, rows)  # Open the pool
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    return samples, time.perf_counter() - started
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub delay per request, in seconds")
+    args = parser.parse_args()
+
+    with StubDune(rows=args.rows, latency=args.latency) as stub:
+        base_url = main.BASE_URL = f"{stub.url}/api/v1"
+
+        samples, elapsed = asyncio.run(run_old(base_url, args.calls, args.rows))
+        print(f"old (client per call, sequential): {describe(samples)}  "
+              f"{args.calls / elapsed:8.1f} calls/s  {stub.connections} connections")
+
+        async def new():
+            try:
+                sequential = await run_new(args.calls, 1, args.rows)
+                stub.reset_counters()
+                concurrent = await run_new(args.calls, args.concurrency, args.rows)
+                return sequential, concurrent
+            finally:
+                await main.get_client().aclose()
+
+        stub.reset_counters()
+        (samples, elapsed), (concurrent_samples, concurrent_elapsed) = asyncio.run(new())
+        print(f"new (pooled client, sequential):   {describe(samples)}  {args.calls / elapsed:8.1f} calls/s")
+        print(f"new (pooled client, {args.concurrency:3d} at once):  {describe(concurrent_samples)}  "
+              f"{args.calls / concurrent_elapsed:8.1f} calls/s  {stub.connections} connections")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,101 @@
+"""
+Fan-out of the /stream/kol-buys server-sent events to many clients.
+
+combined_server.py's app is started in-process with its Dune client pointed at a
+local stub. Each run connects `--clients` SSE clients, then adds `--buys` new buys to
+the stub's result `--rounds` times and measures how long every client takes to
+receive them. The time counts from the new rows appearing upstream, so it includes
+waiting for the next poll (`--poll-interval`). The stream polls Dune once per
+interval however many clients are connected and encodes each buy once, so the Dune
+requests per poll interval should stay flat as the client count grows. Server, stub
+and clients share one process, so at high client counts the run is bound by one CPU.
+
+    python benchmarks/bench_kol_stream.py --clients 10 100 500 --rounds 5 --buys 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+
+os.environ.setdefault("DUNE_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combined_server  # noqa: E402
+from load_test_rpc import start_server  # noqa: E402
+from stub_servers import StubCoinGecko, StubDune, percentile  # noqa: E402
+
+
+async def fan_out(url: str, stub: StubDune, clients: int, rounds: int, buys: int, poll_interval: float) -> tuple:
+    received = [[] for _ in range(clients)]  # Arrival time of every event, per client
+    connected = asyncio.Event()
+    opened = 0
+
+    async def client(session, index):
+        nonlocal opened
+        async with session.get(f"{url}/stream/kol-buys") as response:
+            opened += 1
+            if opened == clients:
+                connected.set()
+            async for line in response.content:
+                if line.startswith(b"id: "):
+                    received[index].append(time.perf_counter())
+
+    connector = aiohttp.TCPConnector(limit=clients)
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        readers = [asyncio.ensure_future(client(session, index)) for index in range(clients)]
+        await asyncio.wait_for(connected.wait(), 60)
+        await asyncio.sleep(2 * poll_interval)  # Let the first poll take the stream's starting cursor
+        stub.reset_counters()
+        events = combined_server.kol_buy_stream.events
+        measured = time.perf_counter()
+        latencies = []
+        for round_number in range(1, rounds + 1):
+            stub.add_rows(buys)
+            started = time.perf_counter()
+            deadline = started + 10 * poll_interval + 10
+            while time.perf_counter() < deadline and any(len(times) < round_number * buys for times in received):
+                await asyncio.sleep(0.005)
+            latencies.extend(times[round_number * buys - 1] - started
+                             for times in received if len(times) >= round_number * buys)
+        missing = sum(max(rounds * buys - len(times), 0) for times in received)
+        encoded = combined_server.kol_buy_stream.events - events
+        polls = (time.perf_counter() - measured) / poll_interval
+        dune_requests = stub.requests / polls
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+    return latencies, missing, encoded, dune_requests
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--buys", type=int, default=5, help="New buys added per round")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="STREAM_POLL_INTERVAL, in seconds")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub delay per request, in seconds")
+    args = parser.parse_args()
+
+    combined_server.STREAM_POLL_INTERVAL = args.poll_interval
+    combined_server.DUNE_POLL_INITIAL_DELAY = 0.01
+    with StubCoinGecko() as coingecko_stub, StubDune(rows=200, latency=args.latency) as dune_stub:
+        url, stop = start_server(coingecko_stub.url, dune_stub.url)
+        try:
+            for clients in args.clients:
+                latencies, missing, encoded, dune_requests = asyncio.run(
+                    fan_out(url, dune_stub, clients, args.rounds, args.buys, args.poll_interval))
+                print(f"{clients:5d} clients  p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+                      f"p95 {percentile(latencies, 0.95) * 1000:7.1f} ms  "
+                      f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  missing {missing}  "
+                      f"{encoded} events encoded  {dune_requests:4.1f} Dune requests/poll interval")
+        finally:
+            stop()
+
+
+if __name__ == "__main__":
+    cli()
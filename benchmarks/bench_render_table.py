@@ -0,0 +1,58 @@
+"""
+Render tool tables with `tabulate` and with `main.render_table` at several sizes.
+
+The rows are those `get_trending_tokens_by_source` renders: rank, token, mint
+address, formatted volume and trade count. Every size is first checked to produce
+identical output.
+
+    python benchmarks/bench_render_table.py --sizes 100 1000 10000 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from tabulate import tabulate
+
+os.environ.setdefault("RADAR_SNAPSHOT_PATH", "")
+os.environ.setdefault("RADAR_REFRESH", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from stub_servers import describe, make_row  # noqa: E402
+
+HEADERS = ["Rank", "Token", "Mint Address", "Volume(12h)", "Total Trades"]
+NUMERIC = [True, False, False, False, True]
+
+
+def table_rows(count: int) -> list:
+    project = main.compile_projection(main.TOOL_SPECS["get_trending_tokens_by_source"].columns, {"source": "Telegram"})
+    return [project(make_row(i)) for i in range(count)]
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--markdown", action="store_true", help="Also time the Markdown mode")
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        rows = table_rows(size)
+        assert main.render_table(HEADERS, rows, NUMERIC) == tabulate(rows, headers=HEADERS)
+        renderers = [("tabulate", lambda: tabulate(rows, headers=HEADERS)),
+                     ("render_table", lambda: main.render_table(HEADERS, rows, NUMERIC))]
+        if args.markdown:
+            renderers.append(("render_table markdown", lambda: main.render_table(HEADERS, rows, NUMERIC, markdown=True)))
+        for name, render in renderers:
+            samples = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                render()
+                samples.append(time.perf_counter() - started)
+            print(f"{size:6d} rows  {name:22s} {describe(samples)}")
+
+
+if __name__ == "__main__":
+    cli()
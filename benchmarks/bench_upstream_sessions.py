@@ -0,0 +1,108 @@
+"""
+Upstream request cost in combined_server.py with and without connection reuse.
+
+Before the pooled sessions, every CoinGecko call and every Dune request (including
+each status poll of an execution) went through module-level `requests` functions,
+opening a new connection each time. The "before" path imitates that with a new
+aiohttp session per request; the "after" path is the wrappers' shared keep-alive
+session. Both run against local stub CoinGecko and Dune servers, with the rate
+limiter lifted so only the transport is measured. The stubs speak plain HTTP, so
+the saving shown leaves out the TLS handshake the real APIs add to every new
+connection.
+
+    python benchmarks/bench_upstream_sessions.py --calls 200 --polls 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combined_server  # noqa: E402
+from stub_servers import StubCoinGecko, StubDune, describe  # noqa: E402
+
+
+async def get_with_new_session(url: str, params: dict = None, method: str = "GET"):
+    async with aiohttp.ClientSession() as session:
+        async with session.request(method, url, params=params) as response:
+            return await response.json()
+
+
+async def coingecko_call_before(base_url: str):
+    return await get_with_new_session(f"{base_url}/simple/price", {"ids": "bitcoin", "vs_currencies": "usd"})
+
+
+async def coingecko_call_after(client: combined_server.CoinGeckoAPI):
+    return await client._make_request("/simple/price", {"ids": "bitcoin", "vs_currencies": "usd"})
+
+
+async def dune_execution_before(base_url: str, polls: int):
+    execution = await get_with_new_session(f"{base_url}/query/1/execute", method="POST")
+    for _ in range(polls):
+        await get_with_new_session(f"{base_url}/execution/{execution['execution_id']}/status")
+    return await get_with_new_session(f"{base_url}/execution/{execution['execution_id']}/results")
+
+
+async def dune_execution_after(client: combined_server.DuneAPI, polls: int):
+    _, execution = await client._request("POST", "execute", 1, "/query/1/execute", json={})
+    for _ in range(polls):
+        await client._request("GET", "status", 1, f"/execution/{execution['execution_id']}/status")
+    return await client._request("GET", "results", 1, f"/execution/{execution['execution_id']}/results")
+
+
+async def measure(calls: int, call) -> list:
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def report(name: str, samples: list, stub):
+    print(f"{name:34s} {describe(samples)}  {len(samples) / sum(samples):8.1f} calls/s  "
+          f"{stub.connections} connections")
+    stub.reset_counters()
+
+
+async def run(args, coingecko_stub, dune_stub):
+    coingecko = combined_server.CoinGeckoAPI()
+    coingecko.base_url = f"{coingecko_stub.url}/api/v3"
+    coingecko.rate_limiter = combined_server.TokenBucket(rate=1e9, burst=10 ** 9)
+    dune = combined_server.DuneAPI()
+    dune.base_url = f"{dune_stub.url}/api/v1"
+    try:
+        report("coingecko before (new connection)",
+               await measure(args.calls, lambda: coingecko_call_before(coingecko.base_url)), coingecko_stub)
+        report("coingecko after (pooled session)",
+               await measure(args.calls, lambda: coingecko_call_after(coingecko)), coingecko_stub)
+        executions = max(args.calls // (args.polls + 2), 1)
+        report(f"dune before ({args.polls} polls/execution)",
+               await measure(executions, lambda: dune_execution_before(dune.base_url, args.polls)), dune_stub)
+        report(f"dune after ({args.polls} polls/execution)",
+               await measure(executions, lambda: dune_execution_after(dune, args.polls)), dune_stub)
+    finally:
+        await coingecko.close()
+        await dune.close()
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=5, help="Status polls per Dune execution")
+    parser.add_argument("--rows", type=int, default=100, help="Rows in each Dune result")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub delay per request, in seconds")
+    args = parser.parse_args()
+
+    with StubCoinGecko(latency=args.latency) as coingecko_stub, \
+            StubDune(rows=args.rows, latency=args.latency) as dune_stub:
+        asyncio.run(run(args, coingecko_stub, dune_stub))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,119 @@
+"""
+Load test of the /rpc endpoint at several numbers of concurrent clients.
+
+By default the combined_server.py app is started in-process with its CoinGecko and
+Dune clients pointed at local stubs that take `--latency` seconds per request, so
+every call waits on (stub) upstream I/O. Each client sends `get_trending_crypto`
+calls back to back, which are not cached and go upstream every time; the CoinGecko
+rate limit is lifted so the server, not the limiter, is measured. Upstream
+concurrency is capped by HTTP_POOL_SIZE (20 connections by default); set it higher
+to see the server's own limit. Server, stubs and clients share one process, so at
+high concurrency the run is bound by one CPU.
+
+With `--url`, the same load is sent to an already running server instead, e.g. the
+earlier Flask server checked out from git, to compare the two.
+
+    python benchmarks/load_test_rpc.py --clients 50 500 --requests 2000 --latency 0.1
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import combined_server  # noqa: E402
+from stub_servers import StubCoinGecko, StubDune, percentile  # noqa: E402
+
+
+def start_server(coingecko_url: str, dune_url: str) -> tuple:
+    """Serve combined_server.py's app from a background thread; returns its URL and a stop function"""
+    combined_server.coingecko.base_url = f"{coingecko_url}/api/v3"
+    combined_server.coingecko.rate_limiter = combined_server.TokenBucket(rate=1e9, burst=10 ** 9)
+    combined_server.dune.base_url = f"{dune_url}/api/v1"
+    started = threading.Event()
+    address = {}
+
+    def run():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(combined_server.create_app(), access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0, backlog=2048)
+        loop.run_until_complete(site.start())
+        address.update(url=f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}", loop=loop, runner=runner)
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+
+    def stop():
+        # Runs the app's shutdown and cleanup hooks, which close the upstream sessions
+        asyncio.run_coroutine_threadsafe(address["runner"].cleanup(), address["loop"]).result()
+        address["loop"].call_soon_threadsafe(address["loop"].stop)
+
+    return address["url"], stop
+
+
+async def load(url: str, clients: int, requests: int) -> tuple:
+    payload = {"jsonrpc": "2.0", "id": 1, "method": "get_trending_crypto", "params": {}}
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def client(session):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                async with session.post(f"{url}/rpc", json=payload) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=clients)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=300)) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(clients)))
+        elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per run")
+    parser.add_argument("--latency", type=float, default=0.1, help="Stub upstream delay per request, in seconds")
+    parser.add_argument("--url", help="Load an already running server instead of starting one")
+    args = parser.parse_args()
+
+    stubs = []
+    url, stop = args.url, None
+    if url is None:
+        stubs = [StubCoinGecko(latency=args.latency).start(), StubDune(latency=args.latency).start()]
+        url, stop = start_server(stubs[0].url, stubs[1].url)
+    try:
+        for clients in args.clients:
+            latencies, errors, elapsed = asyncio.run(load(url, clients, args.requests))
+            print(f"{clients:5d} clients  {len(latencies) / elapsed:8.1f} req/s  "
+                  f"p50 {percentile(latencies, 0.5) * 1000:8.1f} ms  p95 {percentile(latencies, 0.95) * 1000:8.1f} ms  "
+                  f"p99 {percentile(latencies, 0.99) * 1000:8.1f} ms  errors {errors}")
+    finally:
+        if stop is not None:
+            stop()
+        for stub in stubs:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    cli()
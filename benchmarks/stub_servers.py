@@ -0,0 +1,242 @@
+"""
+Local stand-ins for the Dune and CoinGecko APIs, used by the benchmarks.
+
+Each stub runs an aiohttp server on 127.0.0.1 in a background thread, so both
+blocking and asyncio clients can call it. Every request can be delayed by a fixed
+`latency` to imitate the network round trip, and the stub counts requests and the
+distinct client connections they arrived on.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+
+def make_row(i: int, position: int = None) -> dict:
+    """
+    One Dune row carrying the fields every radar query reads.
+
+    Rows with a higher number `i` are newer; `position` is the row's place in the
+    result and sets its rank (defaults to `i`).
+    """
+    mint = f"Mint{i:08d}pump"
+    rank = (i if position is None else position) + 1
+    return {
+        "rank": rank,
+        "volume_rank": rank,
+        "token_link": f'<a href="https://dexscreener.com/solana/{mint}">TOK{i % 500}</a>',
+        "asset_with_chart": f'<a href="https://dexscreener.com/solana/{mint}">TOK{i % 500}</a>',
+        "token_with_chart": f'<a href="https://dexscreener.com/solana/{mint}">TOK{i % 500}</a>',
+        "token_address_with_chart": f'<a href="https://dexscreener.com/solana/{mint}">{mint}</a>',
+        "contract_with_chart": f'<a href="https://dexscreener.com/solana/{mint}">{mint}</a>',
+        "contract_address": mint,
+        "kol_with_link": f'<a href="https://x.com/kol{i % 50}">kol{i % 50}</a>',
+        "token": f"TOK{i % 500}",
+        "token_mint_address": mint,
+        "token_address": mint,
+        "total_volume_usd": 1_000_000 / (i + 1),
+        "total_volume": 1_000_000 / (i + 1),
+        "total_volume_5h": 500_000 / (i + 1),
+        "total_volume_12h": 800_000 / (i + 1),
+        "total_volume_24h": 1_000_000 / (i + 1),
+        "volume_usd": 750_000 / (i + 1),
+        "market_cap": 5_000_000 / (i + 1),
+        "amount_usd": 100.0 + i,
+        "total_trades": 10_000 - i,
+        "trade_count": 5_000 - i,
+        "unique_kols": i % 20,
+        "total_buys": i % 90,
+        "buy_time": f"2025-06-14 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "graduation_time": f"2025-06-14 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "transaction_time": f"2025-06-14 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+        "kol_name": f"kol{i % 50}",
+        "token_symbol": f"TOK{i % 500}",
+        "usd_amount": 100.0 + i,
+        "tx_hash": f"tx{i:012d}",
+    }
+
+
+class StubServer:
+    """Run an aiohttp application on a free local port in a background thread"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self._peers = set()
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self.url = None
+
+    @property
+    def connections(self) -> int:
+        """Distinct client connections that have sent at least one request"""
+        return len(self._peers)
+
+    def reset_counters(self):
+        self.requests = 0
+        self._peers.clear()
+
+    def routes(self) -> web.RouteTableDef:
+        raise NotImplementedError
+
+    @web.middleware
+    async def _count(self, request, handler):
+        self.requests += 1
+        self._peers.add(request.transport.get_extra_info("peername") if request.transport else None)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def start(self) -> "StubServer":
+        started = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            app = web.Application(middlewares=[self._count])
+            app.add_routes(self.routes())
+            self._runner = web.AppRunner(app, access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0, backlog=2048)
+            self._loop.run_until_complete(site.start())
+            port = site._server.sockets[0].getsockname()[1]
+            self.url = f"http://127.0.0.1:{port}"
+            started.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        started.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class StubDune(StubServer):
+    """
+    The Dune endpoints the radar uses, serving `rows` generated rows per query.
+
+    Results are paginated like Dune's (`next_offset`), executions complete on their
+    first status poll, and `execution_ended_at` is the time of the last `add_rows`
+    call (or of the stub's start). Results list the newest row first; `add_rows`
+    makes the next results start with newer rows, as a refreshed query would.
+    """
+
+    def __init__(self, rows: int = 1000, latency: float = 0.0):
+        super().__init__(latency)
+        self.rows = rows
+        self.newest = rows - 1
+        self.ended_at = self._now()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    def add_rows(self, count: int):
+        """Put `count` newer rows at the top of every query's result"""
+        self.newest += count
+        self.ended_at = self._now()
+
+    def result(self, query_id: int, execution_id: str, limit: int, offset: int) -> dict:
+        end = min(self.rows, offset + limit) if limit > 0 else self.rows
+        rows = [make_row(self.newest - position, position) for position in range(offset, end)]
+        body = {
+            "execution_id": execution_id,
+            "query_id": query_id,
+            "state": "QUERY_STATE_COMPLETED",
+            "execution_ended_at": self.ended_at,
+            "result": {"rows": rows, "metadata": {"total_row_count": self.rows}},
+        }
+        if end < self.rows:
+            body["next_offset"] = end
+        return body
+
+    def routes(self) -> web.RouteTableDef:
+        routes = web.RouteTableDef()
+
+        @routes.get("/api/v1/query/{query_id}/results")
+        async def query_results(request):
+            query_id = int(request.match_info["query_id"])
+            limit = int(request.query.get("limit", 1000))
+            return web.json_response(self.result(query_id, f"01-{query_id}", limit, 0))
+
+        @routes.get("/api/v1/execution/{execution_id}/results")
+        async def execution_results(request):
+            execution_id = request.match_info["execution_id"]
+            query_id = int(execution_id.rsplit("-", 1)[-1])
+            limit = int(request.query.get("limit", 1000))
+            offset = int(request.query.get("offset", 0))
+            return web.json_response(self.result(query_id, execution_id, limit, offset))
+
+        @routes.post("/api/v1/query/{query_id}/execute")
+        async def execute(request):
+            return web.json_response({"execution_id": f"01-{request.match_info['query_id']}",
+                                      "state": "QUERY_STATE_PENDING"})
+
+        @routes.get("/api/v1/execution/{execution_id}/status")
+        async def status(request):
+            return web.json_response({"execution_id": request.match_info["execution_id"],
+                                      "state": "QUERY_STATE_COMPLETED"})
+
+        return routes
+
+
+class StubCoinGecko(StubServer):
+    """The CoinGecko endpoints combined_server.py uses, with generated prices and markets"""
+
+    def routes(self) -> web.RouteTableDef:
+        routes = web.RouteTableDef()
+
+        @routes.get("/api/v3/simple/price")
+        async def simple_price(request):
+            ids = [coin_id for coin_id in request.query.get("ids", "").split(",") if coin_id]
+            currencies = request.query.get("vs_currencies", "usd").split(",")
+            return web.json_response({
+                coin_id: {currency: 100.0 + len(coin_id) for currency in currencies} for coin_id in ids
+            })
+
+        @routes.get("/api/v3/search/trending")
+        async def trending(request):
+            return web.json_response({"coins": [{"item": {"id": f"coin{i}", "market_cap_rank": i}} for i in range(15)]})
+
+        @routes.get("/api/v3/coins/markets")
+        async def markets(request):
+            per_page = int(request.query.get("per_page", 100))
+            page = int(request.query.get("page", 1))
+            first = (page - 1) * per_page
+            return web.json_response([
+                {"id": f"coin{i}", "market_cap_rank": i + 1, "current_price": 1000.0 / (i + 1)}
+                for i in range(first, first + per_page)
+            ])
+
+        return routes
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def describe(samples: list) -> str:
+    """Mean, p50 and p95 of latency samples in milliseconds"""
+    mean = sum(samples) / len(samples)
+    return (f"mean {mean * 1000:7.2f} ms  p50 {percentile(samples, 0.5) * 1000:7.2f} ms  "
+            f"p95 {percentile(samples, 0.95) * 1000:7.2f} ms")
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
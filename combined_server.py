@@ -8,67 +8,570 @@ import os
 import json
 import asyncio
 import aiohttp
-import requests
+import gzip
+import hashlib
+import threading
 import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from aiohttp import web
 from dotenv import load_dotenv
+from dune_rows import RecentRows, format_cursor, is_newer, parse_cursor, parse_timestamp
+
+# Optional fast JSON encoder and extra compression codecs
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 # Load environment variables
 load_dotenv()
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
-
 # Configuration
 DUNE_API_KEY = os.getenv('DUNE_API_KEY', 'MIw6jzH7qTbjEkIbj28rcUw03UMbSSuS')
 COINGECKO_API_KEY = os.getenv('COINGECKO_PRO_API_KEY', 'CG-uTLpPCQ9ST4Y9Z7M1JaGcYYm')
 PORT = int(os.getenv('PORT', 3000))
 
+# CoinGecko plan rate limits (requests/minute, burst); the plan does not change the endpoint
+COINGECKO_TIERS = {
+    'demo': {'rate_per_minute': 30, 'burst': 5},
+    'pro': {'rate_per_minute': 500, 'burst': 25}
+}
+COINGECKO_ENVIRONMENT = os.getenv('COINGECKO_ENVIRONMENT', 'demo')
+COINGECKO_TIER = COINGECKO_TIERS.get(COINGECKO_ENVIRONMENT, COINGECKO_TIERS['demo'])
+COINGECKO_RATE_PER_MINUTE = float(os.getenv('COINGECKO_RATE_PER_MINUTE', COINGECKO_TIER['rate_per_minute']))
+COINGECKO_BURST = int(os.getenv('COINGECKO_BURST', COINGECKO_TIER['burst']))
+
+# Upstream HTTP settings
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 30))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 20))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+HTTP_RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Circuit breakers: consecutive failures that open a circuit, and seconds before a probe
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv('CIRCUIT_RESET_TIMEOUT', 30))
+# How long the last good memecoin result may be served while Dune is unavailable
+STALE_RESULT_MAX_AGE = float(os.getenv('STALE_RESULT_MAX_AGE', 3600))
+STALE_RESULT_MAX_ENTRIES = int(os.getenv('STALE_RESULT_MAX_ENTRIES', 64))
+
+# Newest KOL buys kept for `since` (delta) requests
+KOL_BUYS_BUFFER_ROWS = int(os.getenv('KOL_BUYS_BUFFER_ROWS', 5000))
+
+# Server-sent event stream of new KOL buys: Dune poll interval while anyone listens,
+# keep-alive interval, and events buffered per client before a slow client is dropped
+STREAM_POLL_INTERVAL = float(os.getenv('STREAM_POLL_INTERVAL', 30))
+STREAM_HEARTBEAT_INTERVAL = float(os.getenv('STREAM_HEARTBEAT_INTERVAL', 15))
+STREAM_QUEUE_SIZE = int(os.getenv('STREAM_QUEUE_SIZE', 1000))
+
+# Responses at least this large are compressed when the client accepts it
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+
+# /simple/price micro-batching: collection window and upstream URL length budget
+PRICE_BATCH_WINDOW = float(os.getenv('PRICE_BATCH_WINDOW_MS', 5)) / 1000
+PRICE_BATCH_MAX_URL_LENGTH = int(os.getenv('PRICE_BATCH_MAX_URL_LENGTH', 2000))
+
+# /coins/markets paging: CoinGecko's page size cap and the largest max_results we serve
+COINGECKO_MAX_PER_PAGE = 250
+MARKET_DATA_MAX_RESULTS = int(os.getenv('MARKET_DATA_MAX_RESULTS', 5000))
+
+# Per-(id, currency, options) price cache
+PRICE_CACHE_TTL = float(os.getenv('PRICE_CACHE_TTL', 30))
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv('PRICE_CACHE_MAX_ENTRIES', 10000))
+
+def create_session(headers: dict) -> aiohttp.ClientSession:
+    """Create a keep-alive client session with a bounded connection pool and explicit timeouts"""
+    return aiohttp.ClientSession(
+        headers=headers,
+        connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, keepalive_timeout=60),
+        timeout=aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+    )
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by threads and asyncio tasks.
+
+    Each call reserves a token up front and then waits outside the lock until its
+    reservation is due, so concurrent callers are served in arrival order and nobody
+    waits while the bucket still has tokens.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate  # Tokens added per second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Take a token and return how many seconds the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Block the calling thread until a token is available; returns the time waited"""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        """Wait without blocking the event loop until a token is available; returns the time waited"""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+# Histogram buckets: latencies in seconds, and status polls per Dune execution
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+POLL_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34)
+
+class Metrics:
+    """Process-local counters and histograms rendered in the Prometheus text format.
+
+    Series are declared up front with `counter`/`histogram`; values that already live
+    elsewhere (cache statistics) are read at scrape time through `collect` callbacks.
+    """
+
+    def __init__(self):
+        self._meta = {}  # name -> (type, help, buckets)
+        self._series = {}  # name -> {labels: value or [bucket counts, sum, count]}
+        self._collectors = []
+
+    def counter(self, name: str, help_text: str):
+        self._meta[name] = ('counter', help_text, None)
+        self._series[name] = {}
+
+    def histogram(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self._meta[name] = ('histogram', help_text, buckets)
+        self._series[name] = {}
+
+    def collect(self, callback):
+        """Register a callback returning [(name, type, help, {labels tuple: value})] per scrape"""
+        self._collectors.append(callback)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self._series[name]
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self._meta[name][2]
+        state = self._series[name].setdefault(tuple(sorted(labels.items())), [[0] * len(buckets), 0.0, 0])
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                state[0][i] += 1
+        state[1] += value
+        state[2] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()) -> str:
+        pairs = [*labels, *extra]
+        if not pairs:
+            return ''
+        escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in pairs) + '}'
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text, buckets) in self._meta.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, value in self._series[name].items():
+                if kind == 'counter':
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                counts, total, count = value
+                for bound, bucket_count in zip(buckets, counts):
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', bound)])} {bucket_count}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {count}")
+                lines.append(f"{name}_sum{self._labels(labels)} {total}")
+                lines.append(f"{name}_count{self._labels(labels)} {count}")
+        for callback in self._collectors:
+            for name, kind, help_text, series in callback():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                lines += [f"{name}{self._labels(labels)} {value}" for labels, value in series.items()]
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+metrics.counter('http_requests_total', 'HTTP requests by route, method and status')
+metrics.histogram('http_request_duration_seconds', 'HTTP request latency by route')
+metrics.counter('rpc_requests_total', 'JSON-RPC calls by method and outcome')
+metrics.histogram('rpc_request_duration_seconds', 'JSON-RPC call latency by method')
+metrics.counter('upstream_requests_total', 'Upstream HTTP requests by service, endpoint and status')
+metrics.histogram('upstream_request_duration_seconds', 'Upstream HTTP request latency by service and endpoint')
+metrics.counter('dune_executions_total', 'Dune execute_query calls by query and outcome (cached, coalesced, executed, rejected)')
+metrics.histogram('dune_execution_polls', 'Status polls per Dune execution', POLL_BUCKETS)
+metrics.counter('rate_limit_wait_seconds_total', 'Time spent waiting on the upstream rate limiter')
+metrics.counter('rate_limit_acquires_total', 'Rate limiter acquisitions, by whether they had to wait')
+metrics.counter('mock_fallback_total', 'Responses served from mock data because the upstream gave nothing')
+metrics.counter('stale_served_total', 'Responses served from the last good result because the upstream gave nothing')
+metrics.counter('circuit_rejections_total', 'Upstream calls skipped because the circuit was open')
+
+class CircuitBreaker:
+    """Fail fast while an upstream is unhealthy.
+
+    The circuit opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. It then goes half-open and lets exactly one probe
+    through: a success closes the circuit, a failure opens it for another period.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """Return whether a call may go upstream now; callers must then record its outcome"""
+        if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = 'half_open'
+        if self.state == 'closed':
+            return True
+        if self.state == 'half_open' and not self._probing:
+            self._probing = True
+            return True
+        metrics.inc('circuit_rejections_total', upstream=self.name)
+        return False
+
+    def record_success(self):
+        self.state = 'closed'
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            if self.state != 'open':
+                print(f"Circuit for {self.name} opened after {self.failures} failure(s)")
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        """Give up an allowed call without an outcome (e.g. it was cancelled)"""
+        self._probing = False
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+def price_field_currency(field: str, currencies: List[str]) -> Optional[str]:
+    """Return the currency a /simple/price field belongs to, or None for shared fields
+
+    Fields are named '<currency>' or '<currency>_<suffix>' (usd, usd_market_cap, ...);
+    anything else, like last_updated_at, applies to every currency.
+    """
+    return next((c for c in currencies if field == c or field.startswith(c + '_')), None)
+
+class PriceCache:
+    """LRU cache of /simple/price results split into (id, currency, options) cells.
+
+    A lookup returns whatever cells are still fresh and the ids that have to be fetched,
+    so overlapping requests only go upstream for the part they do not share. Ids that
+    CoinGecko does not know are cached as empty cells so they are not re-requested.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cells = OrderedDict()  # (id, currency, options) -> (expires_at, fields)
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def lookup(self, ids: List[str], vs_currencies: List[str], options: dict):
+        """Return ({id: fields} assembled from fresh cells, [ids with a missing or expired cell])"""
+        options_key = tuple(sorted(options.items()))
+        now = time.monotonic()
+        prices, missing = {}, []
+        for coin_id in dict.fromkeys(ids):
+            fields = {}
+            for currency in vs_currencies:
+                key = (coin_id, currency, options_key)
+                cell = self._cells.get(key)
+                if cell is not None and cell[0] <= now:
+                    del self._cells[key]
+                    self.expirations += 1
+                    cell = None
+                if cell is None:
+                    self.misses += 1
+                    missing.append(coin_id)
+                    break
+                self.hits += 1
+                self._cells.move_to_end(key)
+                fields.update(cell[1])
+            else:
+                prices[coin_id] = fields
+        return prices, missing
+
+    def store(self, prices: dict, vs_currencies: List[str], options: dict):
+        """Cache every (id, currency) cell of a fetched {id: fields} result"""
+        options_key = tuple(sorted(options.items()))
+        expires_at = time.monotonic() + self.ttl
+        for coin_id, fields in prices.items():
+            for currency in vs_currencies:
+                key = (coin_id, currency, options_key)
+                self._cells[key] = (expires_at, {
+                    field: value for field, value in fields.items()
+                    if price_field_currency(field, vs_currencies) in (currency, None)
+                })
+                self._cells.move_to_end(key)
+        while len(self._cells) > self.max_entries:
+            self._cells.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._cells),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "expirations": self.expirations,
+            "evictions": self.evictions
+        }
+
+class RecentResults:
+    """LRU map of results to the time they were stored, bounded by age and entry count"""
+
+    def __init__(self, max_age: float, max_entries: int):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, max_age: float = None):
+        """Return (stored_at, value) for `key` if it is younger than `max_age`, else None
+
+        A caller's own `max_age` can only be shorter than the map's; an entry too old for
+        that caller stays for the others.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.time() - entry[0]
+        if age >= self.max_age:
+            del self._entries[key]
+            return None
+        if max_age is not None and age >= max_age:
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key, value):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class PriceBatcher:
+    """Coalesce concurrent /simple/price lookups into shared upstream calls.
+
+    Requests arriving within `window` seconds of each other with the same options are
+    merged: their ids and currencies are unioned, split into chunks that keep the URL
+    under `max_url_length`, fetched concurrently, and each caller gets back only the
+    ids and currency fields it asked for. Ids CoinGecko answered for but does not know
+    come back as empty dicts; ids whose chunk failed are left out.
+    """
+
+    def __init__(self, client: 'CoinGeckoAPI', window: float, max_url_length: int):
+        self.client = client
+        self.window = window
+        self.max_url_length = max_url_length
+        self._pending = {}  # options -> [(ids, vs_currencies, future)]
+        self._flushes = set()
+
+    async def get(self, ids: List[str], vs_currencies: List[str], **options):
+        """Return {id: {field: value}} for the ids of `ids` that got an upstream answer"""
+        loop = asyncio.get_running_loop()
+        key = tuple(sorted(options.items()))
+        future = loop.create_future()
+        group = self._pending.setdefault(key, [])
+        group.append((ids, vs_currencies, future))
+        if len(group) == 1:
+            loop.call_later(self.window, self._start_flush, key)
+        return await asyncio.shield(future)
+
+    def _start_flush(self, key):
+        task = asyncio.ensure_future(self._flush(key, self._pending.pop(key)))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    def _chunk_ids(self, ids: List[str], vs_currencies: str, options: dict) -> List[List[str]]:
+        """Split ids so every request URL (roughly, before escaping) fits the length budget"""
+        overhead = len(f"{self.client.base_url}/simple/price?ids=&vs_currencies={vs_currencies}")
+        overhead += sum(len(f"&{name}={value}") for name, value in options.items())
+        budget = max(self.max_url_length - overhead, 1)
+        chunks, chunk, length = [], [], 0
+        for coin_id in ids:
+            if chunk and length + len(coin_id) + 1 > budget:
+                chunks.append(chunk)
+                chunk, length = [], 0
+            chunk.append(coin_id)
+            length += len(coin_id) + 1
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    async def _flush(self, key, group):
+        options = dict(key)
+        all_ids = sorted({coin_id for ids, _, _ in group for coin_id in ids})
+        all_currencies = sorted({currency for _, currencies, _ in group for currency in currencies})
+        vs_currencies = ','.join(all_currencies)
+        chunks = self._chunk_ids(all_ids, vs_currencies, options)
+        try:
+            responses = await asyncio.gather(*(
+                self.client._make_request('/simple/price', {'ids': ','.join(chunk), 'vs_currencies': vs_currencies, **options})
+                for chunk in chunks
+            ))
+        except Exception as e:
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        prices = {}
+        for chunk, response in zip(chunks, responses):
+            if response is not None:
+                for coin_id in chunk:
+                    prices[coin_id] = response.get(coin_id, {})
+        for ids, currencies, future in group:
+            if not future.done():
+                future.set_result(self._slice(prices, ids, currencies, all_currencies))
+
+    @staticmethod
+    def _slice(prices: dict, ids: List[str], currencies: List[str], all_currencies: List[str]) -> dict:
+        """Keep the caller's ids and, per id, the fields of the caller's currencies plus shared ones"""
+        wanted = set(currencies)
+        wanted.add(None)
+        return {
+            coin_id: {
+                field: value for field, value in prices[coin_id].items()
+                if price_field_currency(field, all_currencies) in wanted
+            }
+            for coin_id in ids if coin_id in prices
+        }
+
 # CoinGecko API wrapper
 class CoinGeckoAPI:
     def __init__(self):
         # Use demo API endpoint for free tier
         self.base_url = "https://api.coingecko.com/api/v3"
         self.headers = {'x-cg-demo-api-key': COINGECKO_API_KEY} if COINGECKO_API_KEY else {}
-        self.rate_limit_delay = 1.2  # Free tier rate limiting
+        self.rate_limiter = TokenBucket(COINGECKO_RATE_PER_MINUTE / 60, COINGECKO_BURST)
+        self.price_batcher = PriceBatcher(self, PRICE_BATCH_WINDOW, PRICE_BATCH_MAX_URL_LENGTH)
+        self.price_cache = PriceCache(PRICE_CACHE_TTL, PRICE_CACHE_MAX_ENTRIES)
+        self.circuit = CircuitBreaker('coingecko', CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        self._session = None
     
-    def _make_request(self, endpoint: str, params: dict = None):
-        """Make rate-limited request to CoinGecko API"""
-        try:
-            time.sleep(self.rate_limit_delay)  # Rate limiting
-            response = requests.get(f"{self.base_url}{endpoint}", headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"CoinGecko API error for {endpoint}: {e}")
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = create_session(self.headers)
+        return self._session
+    
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+    
+    async def _make_request(self, endpoint: str, params: dict = None):
+        """Make rate-limited request to CoinGecko API, retrying transient failures with backoff
+
+        Returns None straight away while the CoinGecko circuit is open.
+        """
+        if not self.circuit.allow():
             return None
+        
+        healthy = None
+        try:
+            result, healthy = await self._request_with_retries(endpoint, params)
+            return result
+        finally:
+            if healthy is None:
+                self.circuit.release()
+            elif healthy:
+                self.circuit.record_success()
+            else:
+                self.circuit.record_failure()
     
-    def get_simple_price(self, ids: List[str], vs_currencies: List[str], **kwargs):
-        """Get simple price data"""
-        params = {
-            'ids': ','.join(ids),
-            'vs_currencies': ','.join(vs_currencies),
-            **kwargs
-        }
+    async def _request_with_retries(self, endpoint: str, params: dict = None):
+        """Return (JSON body or None, whether CoinGecko answered without a server-side failure)"""
+        session = self._get_session()
+        for attempt in range(HTTP_MAX_RETRIES + 1):
+            delay = 0.5 * 2 ** attempt
+            waited = await self.rate_limiter.acquire_async()
+            metrics.inc('rate_limit_wait_seconds_total', waited, upstream='coingecko')
+            metrics.inc('rate_limit_acquires_total', upstream='coingecko', waited='yes' if waited else 'no')
+            started = time.perf_counter()
+            status = 'error'
+            try:
+                async with session.get(f"{self.base_url}{endpoint}", params=params) as response:
+                    status = response.status
+                    if response.status in HTTP_RETRY_STATUSES and attempt < HTTP_MAX_RETRIES:
+                        retry_after = response.headers.get('Retry-After', '')
+                        delay = float(retry_after) if retry_after.isdigit() else delay
+                    else:
+                        response.raise_for_status()
+                        return await response.json(), True
+            except (aiohttp.ClientResponseError, aiohttp.ContentTypeError) as e:
+                print(f"CoinGecko API error for {endpoint}: {e}")
+                # A client error (bad id, bad parameter) says nothing about CoinGecko's health
+                return None, e.status not in HTTP_RETRY_STATUSES
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = 'timeout' if isinstance(e, asyncio.TimeoutError) else 'error'
+                if attempt == HTTP_MAX_RETRIES:
+                    print(f"CoinGecko API error for {endpoint}: {e!r}")
+                    return None, False
+            finally:
+                metrics.inc('upstream_requests_total', upstream='coingecko', endpoint=endpoint, status=status)
+                metrics.observe('upstream_request_duration_seconds', time.perf_counter() - started,
+                                upstream='coingecko', endpoint=endpoint)
+            await asyncio.sleep(delay)
+        return None, False
+    
+    async def get_simple_price(self, ids: List[str], vs_currencies: List[str], **kwargs):
+        """Get simple price data, fetching only the ids not already in the price cache"""
+        prices, missing = self.price_cache.lookup(ids, vs_currencies, kwargs)
+        if missing:
+            fetched = await self.price_batcher.get(missing, vs_currencies, **kwargs)
+            self.price_cache.store(fetched, vs_currencies, kwargs)
+            prices.update(fetched)
         
-        result = self._make_request('/simple/price', params)
+        result = {coin_id: prices[coin_id] for coin_id in ids if prices.get(coin_id)}
         if result:
             return result
         
         # Fallback mock data
+        metrics.inc('mock_fallback_total', method='get_crypto_price')
         return {ids[0]: {vs_currencies[0]: 45000}} if ids and vs_currencies else {}
     
-    def get_trending(self):
+    async def get_trending(self):
         """Get trending cryptocurrencies"""
-        result = self._make_request('/search/trending')
+        result = await self._make_request('/search/trending')
         if result:
             return result
         
         # Fallback mock data
+        metrics.inc('mock_fallback_total', method='get_trending_crypto')
         return {
             "coins": [
                 {"item": {"id": "bitcoin", "name": "Bitcoin", "symbol": "BTC", "market_cap_rank": 1}},
@@ -77,15 +580,57 @@ class CoinGeckoAPI:
             ]
         }
     
-    def get_coins_markets(self, vs_currency="usd", **kwargs):
+    async def get_coins_markets(self, vs_currency="usd", **kwargs):
         """Get coins market data"""
         params = {'vs_currency': vs_currency, **kwargs}
         
-        result = self._make_request('/coins/markets', params)
+        result = await self._make_request('/coins/markets', params)
         if result:
             return result
         
+        return self._mock_coins_markets()
+    
+    async def get_top_coins_markets(self, vs_currency="usd", max_results=COINGECKO_MAX_PER_PAGE, **kwargs):
+        """Get up to `max_results` coins in rank order, requesting all pages concurrently
+
+        Pages go through the shared rate limiter, so they are sent as fast as the budget
+        allows. The merged list stops at the first short page. Failed pages are requested
+        once more; if one still fails, the call raises instead of returning a truncated
+        list. Mock data is served only when no page could be fetched at all.
+        """
+        if not 0 < max_results <= MARKET_DATA_MAX_RESULTS:
+            raise ValueError(f"max_results must be between 1 and {MARKET_DATA_MAX_RESULTS}")
+        
+        kwargs.pop('per_page', None)
+        first_page = int(kwargs.pop('page', 1) or 1)
+        per_page = min(max_results, COINGECKO_MAX_PER_PAGE)
+        page_numbers = range(first_page, first_page + -(-max_results // per_page))
+        fetch_page = lambda page: self._make_request(
+            '/coins/markets', {'vs_currency': vs_currency, 'per_page': per_page, 'page': page, **kwargs})
+        pages = await asyncio.gather(*(fetch_page(page) for page in page_numbers))
+        failed = [i for i, page in enumerate(pages) if page is None]
+        if failed:
+            for i, page in zip(failed, await asyncio.gather(*(fetch_page(page_numbers[i]) for i in failed))):
+                pages[i] = page
+        
+        result = []
+        for page_number, page in zip(page_numbers, pages):
+            if page is None:
+                if any(pages):
+                    raise RuntimeError(f"CoinGecko page {page_number} failed; got {len(result)} of {max_results} coins")
+                break
+            result.extend(page)
+            if len(page) < per_page:
+                break
+        if result:
+            return result[:max_results]
+        
+        return self._mock_coins_markets()
+    
+    @staticmethod
+    def _mock_coins_markets():
         # Fallback mock data
+        metrics.inc('mock_fallback_total', method='get_market_data')
         return [
             {
                 "id": "bitcoin",
@@ -107,42 +652,143 @@ class CoinGeckoAPI:
             }
         ]
 
+# Dune execution settings
+DUNE_EXECUTION_TIMEOUT = float(os.getenv('DUNE_EXECUTION_TIMEOUT', 30))
+DUNE_POLL_INITIAL_DELAY = float(os.getenv('DUNE_POLL_INITIAL_DELAY', 0.25))
+DUNE_POLL_MAX_DELAY = float(os.getenv('DUNE_POLL_MAX_DELAY', 5))
+DUNE_RESULT_MAX_AGE = float(os.getenv('DUNE_RESULT_MAX_AGE', 300))
+DUNE_RESULT_MAX_ENTRIES = int(os.getenv('DUNE_RESULT_MAX_ENTRIES', 64))
+
+DUNE_COMPLETED_STATES = {'QUERY_STATE_COMPLETED', 'QUERY_STATE_COMPLETED_PARTIAL'}
+DUNE_FAILED_STATES = {'QUERY_STATE_FAILED', 'QUERY_STATE_CANCELLED', 'QUERY_STATE_EXPIRED'}
+
 # Dune Analytics API wrapper
 class DuneAPI:
+    """Dune Analytics client built on an asyncio execution manager
+
+    Executions share one pooled aiohttp session. Status is polled with exponential
+    backoff, callers asking for the same (query_id, parameters) share one in-flight
+    execution, and a completed result younger than DUNE_RESULT_MAX_AGE is reused
+    instead of paying for a new run. While the Dune circuit is open, new executions
+    are refused immediately instead of waiting out the polling deadline.
+    """
+
     def __init__(self):
         self.api_key = DUNE_API_KEY
         self.base_url = "https://api.dune.com/api/v1"
         self.headers = {'X-Dune-API-Key': self.api_key} if self.api_key else {}
-    
-    def execute_query(self, query_id: int, parameters: dict = None):
-        """Execute a Dune query"""
+        self._session = None
+        self._inflight = {}  # (query_id, parameters) -> asyncio.Task
+        self._results = RecentResults(DUNE_RESULT_MAX_AGE, DUNE_RESULT_MAX_ENTRIES)
+        self.circuit = CircuitBreaker('dune', CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = create_session(self.headers)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    async def execute_query(self, query_id: int, parameters: dict = None, max_age: float = None):
+        """Execute a Dune query, sharing in-flight executions and reusing recent results
+
+        `max_age` lowers the age up to which a stored result is reused for this call.
+        """
         if not self.api_key:
             return None
         
+        key = dune_result_key(query_id, parameters)
+        cached = self._results.get(key, max_age)
+        if cached:
+            metrics.inc('dune_executions_total', query_id=query_id, outcome='cached')
+            return cached[1]
+        
+        task = self._inflight.get(key)
+        if task is None:
+            if not self.circuit.allow():
+                metrics.inc('dune_executions_total', query_id=query_id, outcome='rejected')
+                return None
+            metrics.inc('dune_executions_total', query_id=query_id, outcome='executed')
+            task = asyncio.ensure_future(self._run_execution(query_id, parameters, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            metrics.inc('dune_executions_total', query_id=query_id, outcome='coalesced')
+        # One caller giving up must not cancel the execution other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def _request(self, method: str, endpoint: str, query_id: int, path: str, **kwargs):
+        """Send one Dune API request and record its latency; returns (status, JSON body if 200)"""
+        started = time.perf_counter()
+        status = 'error'
+        try:
+            async with self._get_session().request(method, f"{self.base_url}{path}", **kwargs) as response:
+                status = response.status
+                return response.status, (await response.json() if response.status == 200 else None)
+        except asyncio.TimeoutError:
+            status = 'timeout'
+            raise
+        finally:
+            metrics.inc('upstream_requests_total', upstream='dune', endpoint=endpoint, query_id=query_id, status=status)
+            metrics.observe('upstream_request_duration_seconds', time.perf_counter() - started,
+                            upstream='dune', endpoint=endpoint, query_id=query_id)
+
+    async def _run_execution(self, query_id: int, parameters: Optional[dict], key: tuple):
+        result = None
+        try:
+            result = await self._execute(query_id, parameters, key)
+            return result
+        finally:
+            if result is not None:
+                self.circuit.record_success()
+            else:
+                self.circuit.record_failure()
+
+    async def _execute(self, query_id: int, parameters: Optional[dict], key: tuple):
+        polls = None
         try:
+            # The latest stored result is free, so use it when it is recent enough
+            if not parameters:
+                status, latest = await self._request('GET', 'latest_results', query_id, f"/query/{query_id}/results")
+                if status == 200:
+                    ended_at = parse_timestamp(latest.get('execution_ended_at'))
+                    if ended_at and time.time() - ended_at < DUNE_RESULT_MAX_AGE:
+                        return self._store_result(key, latest)
+            
             # Execute query
-            execute_url = f"{self.base_url}/query/{query_id}/execute"
             payload = {"query_parameters": parameters} if parameters else {}
-            
-            execute_response = requests.post(execute_url, headers=self.headers, json=payload)
-            execute_response.raise_for_status()
-            execution_id = execute_response.json().get('execution_id')
+            status, execution = await self._request('POST', 'execute', query_id, f"/query/{query_id}/execute", json=payload)
+            if status != 200:
+                raise RuntimeError(f"execute returned HTTP {status}")
+            execution_id = execution.get('execution_id')
             
             if not execution_id:
                 return None
             
-            # Poll for results
-            results_url = f"{self.base_url}/execution/{execution_id}/results"
-            
-            for attempt in range(30):  # Wait up to 30 seconds
-                time.sleep(1)
-                results_response = requests.get(results_url, headers=self.headers)
+            # Poll status with exponential backoff until the execution finishes
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + DUNE_EXECUTION_TIMEOUT
+            delay = DUNE_POLL_INITIAL_DELAY
+            polls = 0
+            while loop.time() + delay < deadline:
+                await asyncio.sleep(delay)
+                delay = min(delay * 1.5, DUNE_POLL_MAX_DELAY)
+                polls += 1
+                status, body = await self._request('GET', 'status', query_id, f"/execution/{execution_id}/status")
+                if status == 429 or status >= 500:
+                    continue  # Transient, keep polling
+                if status != 200:
+                    raise RuntimeError(f"status returned HTTP {status}")
+                state = body.get('state')
                 
-                if results_response.status_code == 200:
-                    return results_response.json()
-                elif results_response.status_code == 202:
-                    continue  # Still processing
-                else:
+                if state in DUNE_COMPLETED_STATES:
+                    status, result = await self._request('GET', 'results', query_id, f"/execution/{execution_id}/results")
+                    if status != 200:
+                        raise RuntimeError(f"results returned HTTP {status}")
+                    return self._store_result(key, result)
+                if state in DUNE_FAILED_STATES:
                     break
             
             return None
@@ -150,79 +796,212 @@ class DuneAPI:
         except Exception as e:
             print(f"Dune API error: {e}")
             return None
+        finally:
+            if polls is not None:
+                metrics.observe('dune_execution_polls', polls, query_id=query_id)
+
+    def _store_result(self, key: tuple, result: dict) -> dict:
+        self._results.put(key, result)
+        return result
 
 # Initialize APIs
 coingecko = CoinGeckoAPI()
 dune = DuneAPI()
 
 # Enhanced memecoin data with Dune Analytics integration
-def get_memecoin_data(method: str, params: dict) -> dict:
-    """Get memecoin data from Dune Analytics or fallback to mock data"""
+
+# Newest KOL buys, merged from every Dune result, for `since` requests and the stream
+recent_kol_buys = RecentRows('transaction_time', 'tx_hash', KOL_BUYS_BUFFER_ROWS)
+
+async def get_kol_buys_since(params: dict) -> dict:
+    """Delta mode of get_recent_kol_buys: only the buys newer than the caller's cursor
+
+    Dune's full recent-buys window is fetched (or reused) and merged into the buffer,
+    and the answer is read from the buffer, so it stays available while Dune is down.
+    """
+    if DUNE_API_KEY:
+        await get_dune_memecoin_data('get_recent_kol_buys', {'limit': 1000})
+    since = str(params['since'])
+    items = recent_kol_buys.since(parse_cursor(since), int(params.get('limit', 10)))
+    buys = format_kol_buys([row for _, row in items])
+    return {
+        "buys": [{**buy, "cursor": format_cursor(cursor)} for buy, (cursor, _) in zip(buys, items)],
+        "next_cursor": format_cursor(items[0][0]) if items else since
+    }
+
+def encode_kol_buy_event(cursor: tuple, row: dict) -> bytes:
+    buy = format_kol_buys([row])[0]
+    return f"id: {format_cursor(cursor)}\nevent: kol_buy\ndata: {dumps_json(buy).decode('utf-8')}\n\n".encode('utf-8')
+
+class KolBuyStream:
+    """Fan new KOL buys out to every connected server-sent event client.
+
+    While at least one client is connected, a single poller refreshes the KOL buys
+    every STREAM_POLL_INTERVAL seconds, reusing no Dune result older than that, and
+    encodes each new buy once; the same bytes
+    are queued for every client with its cursor. A client whose queue fills up is
+    disconnected rather than slowing the others down.
+    """
+
+    def __init__(self, buffer: RecentRows):
+        self.buffer = buffer
+        self._queues = set()
+        self._poller = None
+        self.events = 0
+        self.dropped = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(STREAM_QUEUE_SIZE)
+        self._queues.add(queue)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.ensure_future(self._poll())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._queues.discard(queue)
+        if not self._queues and self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    def close(self):
+        """End every stream, e.g. on shutdown"""
+        for queue in list(self._queues):
+            self._drop(queue)
+        if self._poller is not None:
+            self._poller.cancel()
+
+    def _drop(self, queue: asyncio.Queue):
+        self._queues.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)  # Tells the stream handler to finish
+
+    async def _poll(self):
+        newest = self.buffer.latest(1)
+        cursor = newest[0][0] if newest else None
+        while True:
+            if DUNE_API_KEY:
+                # A result reused for DUNE_RESULT_MAX_AGE would hold the stream back that long
+                await get_dune_memecoin_data('get_recent_kol_buys', {'limit': 1000}, max_age=STREAM_POLL_INTERVAL)
+            if cursor is None:
+                newest = self.buffer.latest(1)
+                cursor = newest[0][0] if newest else None
+                items = []
+            else:
+                items = self.buffer.since(cursor, 0)
+            if items:
+                cursor = items[0][0]
+                self.publish([(item_cursor, encode_kol_buy_event(item_cursor, row)) for item_cursor, row in reversed(items)])
+            await asyncio.sleep(STREAM_POLL_INTERVAL)
+
+    def publish(self, events: list):
+        """Queue (cursor, encoded event) pairs, oldest first, for every client"""
+        for queue in list(self._queues):
+            try:
+                for event in events:
+                    queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._drop(queue)
+                self.dropped += 1
+        self.events += len(events)
+
+    def stats(self) -> dict:
+        return {"clients": len(self._queues), "events": self.events, "dropped": self.dropped}
+
+kol_buy_stream = KolBuyStream(recent_kol_buys)
+
+# Last good real (formatted) result per Dune query and parameters
+last_good_memecoin_data = RecentResults(STALE_RESULT_MAX_AGE, STALE_RESULT_MAX_ENTRIES)
+
+async def get_memecoin_data(method: str, params: dict) -> dict:
+    """Get memecoin data from Dune Analytics, the last good result, or fallback mock data
+
+    A last good result is served with `data_age_seconds` added to every row.
+    """
+    if method == 'get_recent_kol_buys' and params.get('since'):
+        return await get_kol_buys_since(params)
+    
+    query = memecoin_query(method, params)
+    key = dune_result_key(*query) if query else None
     
     # Try to get real data from Dune Analytics
     if DUNE_API_KEY:
-        real_data = get_dune_memecoin_data(method, params)
+        real_data = await get_dune_memecoin_data(method, params)
         if real_data:
+            last_good_memecoin_data.put(key, real_data)
             return real_data
     
+    # Serve the last good real result while it is recent enough
+    last_good = last_good_memecoin_data.get(key)
+    if last_good:
+        metrics.inc('stale_served_total', method=method)
+        age = round(time.time() - last_good[0], 1)
+        return [{**row, "data_age_seconds": age} for row in last_good[1]]
+    
     # Fallback to enhanced mock data
+    metrics.inc('mock_fallback_total', method=method)
     return get_enhanced_mock_data(method, params)
 
-def get_dune_memecoin_data(method: str, params: dict):
-    """Get real memecoin data from Dune Analytics"""
-    
-    # Dune query IDs for different memecoin data
-    # Note: These would need to be actual Dune query IDs for Solana memecoin data
-    QUERY_IDS = {
-        "trending_tokens": 2234567,  # Example query ID
-        "pumpfun_graduates": 2234568,
-        "kol_buys": 2234569,
-        "raydium_trending": 2234570
-    }
+# Dune query IDs for different memecoin data
+# Note: These would need to be actual Dune query IDs for Solana memecoin data
+MEMECOIN_QUERY_IDS = {
+    "trending_tokens": 2234567,  # Example query ID
+    "pumpfun_graduates": 2234568,
+    "kol_buys": 2234569,
+    "raydium_trending": 2234570
+}
+
+def memecoin_query(method: str, params: dict):
+    """Return the (query_id, query_parameters) Dune runs for a memecoin method, or None
+
+    Only the parameters the query uses are kept, with normalized types, so the result
+    caches are keyed on what was actually sent upstream rather than on raw client params.
+    """
+    limit = int(params.get('limit', 10))
+    if method == "get_trending_tokens_by_source":
+        # This would query Dune for trending Solana tokens by source
+        return MEMECOIN_QUERY_IDS["trending_tokens"], {
+            "source": str(params.get('source', 'Telegram')),
+            "limit": limit,
+            "time_range": "12h"
+        }
+    if method == "get_pumpfun_graduates_by_marketcap":
+        return MEMECOIN_QUERY_IDS["pumpfun_graduates"], {
+            "limit": limit,
+            "sort_by": "market_cap",
+            "time_range": "24h"
+        }
+    if method == "get_recent_kol_buys":
+        return MEMECOIN_QUERY_IDS["kol_buys"], {
+            "limit": limit,
+            "time_range": "24h"
+        }
+    if method == "get_trending_tokens_on_raydium":
+        return MEMECOIN_QUERY_IDS["raydium_trending"], {
+            "time_span": str(params.get('time_span', '24h')),
+            "limit": limit
+        }
+    return None
+
+def dune_result_key(query_id: int, parameters: dict = None) -> tuple:
+    return query_id, json.dumps(parameters or {}, sort_keys=True)
+
+async def get_dune_memecoin_data(method: str, params: dict, max_age: float = None):
+    """Get real memecoin data from Dune Analytics, reusing a result up to `max_age` old"""
+    query = memecoin_query(method, params)
+    if query is None:
+        return None
     
     try:
-        if method == "get_trending_tokens_by_source":
-            # This would query Dune for trending Solana tokens by source
-            query_params = {
-                "source": params.get('source', 'Telegram'),
-                "limit": params.get('limit', 10),
-                "time_range": "12h"
-            }
-            result = dune.execute_query(QUERY_IDS["trending_tokens"], query_params)
-            
-            if result and result.get('result', {}).get('rows'):
-                return format_trending_tokens(result['result']['rows'])
-        
-        elif method == "get_pumpfun_graduates_by_marketcap":
-            query_params = {
-                "limit": params.get('limit', 10),
-                "sort_by": "market_cap",
-                "time_range": "24h"
-            }
-            result = dune.execute_query(QUERY_IDS["pumpfun_graduates"], query_params)
-            
-            if result and result.get('result', {}).get('rows'):
-                return format_pumpfun_graduates(result['result']['rows'])
-        
-        elif method == "get_recent_kol_buys":
-            query_params = {
-                "limit": params.get('limit', 10),
-                "time_range": "24h"
-            }
-            result = dune.execute_query(QUERY_IDS["kol_buys"], query_params)
-            
-            if result and result.get('result', {}).get('rows'):
-                return format_kol_buys(result['result']['rows'])
-        
-        elif method == "get_trending_tokens_on_raydium":
-            query_params = {
-                "time_span": params.get('time_span', '24h'),
-                "limit": params.get('limit', 10)
-            }
-            result = dune.execute_query(QUERY_IDS["raydium_trending"], query_params)
-            
-            if result and result.get('result', {}).get('rows'):
-                return format_raydium_trending(result['result']['rows'])
+        result = await dune.execute_query(*query, max_age=max_age)
+        rows = result.get('result', {}).get('rows') if result else None
+        if rows:
+            if method == "get_recent_kol_buys":
+                recent_kol_buys.merge(rows)
+                # Every buy carries its cursor, so a poller can switch to `since` from here
+                return [{**buy, "cursor": format_cursor(recent_kol_buys.cursor(row))}
+                        for buy, row in zip(format_kol_buys(rows), rows)]
+            return MEMECOIN_FORMATTERS[method](rows)
     
     except Exception as e:
         print(f"Error fetching Dune data for {method}: {e}")
@@ -281,6 +1060,13 @@ def format_raydium_trending(rows):
         for row in rows
     ]
 
+MEMECOIN_FORMATTERS = {
+    "get_trending_tokens_by_source": format_trending_tokens,
+    "get_pumpfun_graduates_by_marketcap": format_pumpfun_graduates,
+    "get_recent_kol_buys": format_kol_buys,
+    "get_trending_tokens_on_raydium": format_raydium_trending
+}
+
 def get_enhanced_mock_data(method: str, params: dict) -> dict:
     """Generate enhanced mock memecoin data for demonstration"""
     
@@ -434,10 +1220,64 @@ def get_enhanced_mock_data(method: str, params: dict) -> dict:
     else:
         return {"message": f"Enhanced mock data for {method}", "params": params}
 
+# Response encoding
+def dumps_json(data) -> bytes:
+    """Serialize a response body, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data).encode('utf-8')
+
+# Encodings we can produce, in our order of preference among equally weighted ones
+CONTENT_ENCODERS = {
+    'br': (lambda body: brotli.compress(body, quality=4)) if brotli else None,
+    'zstd': zstandard.ZstdCompressor(level=3).compress if zstandard else None,
+    'gzip': lambda body: gzip.compress(body, compresslevel=6)
+}
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the available encoding with the highest client q-value (> 0), or None"""
+    accepted = {}
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    best, best_quality = None, 0.0
+    for name, encoder in CONTENT_ENCODERS.items():
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if encoder is not None and quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak If-None-Match comparison, as used for GET revalidation"""
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return '*' in tags or etag.removeprefix('W/') in tags
+
+def encoded_response(request, body: bytes, status: int = 200, headers: dict = None) -> web.Response:
+    """Build a JSON response, compressing bodies above COMPRESSION_MIN_BYTES when accepted"""
+    headers = dict(headers or {})
+    if len(body) >= COMPRESSION_MIN_BYTES:
+        headers['Vary'] = 'Accept-Encoding'
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding:
+            body = CONTENT_ENCODERS[encoding](body)
+            headers['Content-Encoding'] = encoding
+    return web.Response(body=body, status=status, headers=headers, content_type='application/json')
+
+def json_response(request, data, status: int = 200) -> web.Response:
+    return encoded_response(request, dumps_json(data), status)
+
 # API Routes (same as before but with enhanced data)
-@app.route('/')
-def home():
-    return jsonify({
+routes = web.RouteTableDef()
+
+@routes.get('/')
+async def home(request):
+    return json_response(request, {
         "name": "Enhanced Crypto MCP Server",
         "description": "CoinGecko + Memecoin Radar with real API integration",
         "version": "2.0.0",
@@ -449,152 +1289,242 @@ def home():
             "health": "/health",
             "schema": "/schema", 
             "rpc": "/rpc (POST)",
-            "ping": "/ping"
+            "ping": "/ping",
+            "cache": "/cache",
+            "stream": "/stream/kol-buys (server-sent events)",
+            "metrics": "/metrics"
         },
         "status": "running"
     })
 
-@app.route('/health')
-def health():
-    return jsonify({
+@routes.get('/health')
+async def health(request):
+    return json_response(request, {
         "status": "healthy",
         "services": {
             "coingecko": "connected" if COINGECKO_API_KEY else "disconnected",
             "dune_analytics": "connected" if DUNE_API_KEY else "disconnected",
             "data_quality": "live" if (COINGECKO_API_KEY and DUNE_API_KEY) else "mixed"
         },
+        "circuits": {
+            "coingecko": coingecko.circuit.snapshot(),
+            "dune_analytics": dune.circuit.snapshot()
+        },
         "timestamp": datetime.now().isoformat(),
         "environment": "production" if (COINGECKO_API_KEY and DUNE_API_KEY) else "development"
     })
 
-@app.route('/ping')
-def ping():
-    return jsonify({"message": "pong", "timestamp": datetime.now().isoformat()})
+@routes.get('/ping')
+async def ping(request):
+    return json_response(request, {"message": "pong", "timestamp": datetime.now().isoformat()})
 
-@app.route('/schema')
-def get_schema():
-    return jsonify({
-        "name": "Enhanced Crypto MCP Server",
-        "description": "CoinGecko + Memecoin Radar with real API integration for ChatGPT",
-        "version": "2.0.0",
-        "tools": [
-            # CoinGecko tools
-            {
-                "name": "get_crypto_price",
-                "description": "Get current cryptocurrency prices from CoinGecko API",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "ids": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Cryptocurrency IDs (e.g., ['bitcoin', 'ethereum'])"
-                        },
-                        "vs_currencies": {
-                            "type": "array", 
-                            "items": {"type": "string"},
-                            "description": "Target currencies (e.g., ['usd', 'eur'])"
-                        },
-                        "include_market_cap": {"type": "boolean"},
-                        "include_24hr_vol": {"type": "boolean"},
-                        "include_24hr_change": {"type": "boolean"}
-                    },
-                    "required": ["ids", "vs_currencies"]
-                }
-            },
-            {
-                "name": "get_trending_crypto",
-                "description": "Get trending cryptocurrencies from CoinGecko",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {},
-                    "required": []
-                }
-            },
-            {
-                "name": "get_market_data", 
-                "description": "Get cryptocurrency market data with filtering options",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "vs_currency": {"type": "string", "description": "Base currency (default: usd)"},
-                        "order": {"type": "string", "description": "Sort order (market_cap_desc, volume_desc, etc.)"},
-                        "per_page": {"type": "number", "description": "Results per page (max 250)"},
-                        "page": {"type": "number", "description": "Page number"},
-                        "sparkline": {"type": "boolean", "description": "Include sparkline data"},
-                        "price_change_percentage": {"type": "string", "description": "Price change periods"}
-                    },
-                    "required": []
-                }
-            },
-            # Enhanced Memecoin Radar tools
-            {
-                "name": "get_trending_memecoins_by_source",
-                "description": "Get trending Solana memecoins by platform with real-time data",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "source": {
-                            "type": "string",
-                            "enum": ["Telegram", "Web", "Mobile"],
-                            "description": "Platform to query for trending tokens"
-                        },
-                        "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"}
+@routes.get('/stream/kol-buys')
+async def stream_kol_buys(request):
+    """Server-sent events of new KOL buys; resume with Last-Event-ID or ?since=<cursor>"""
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+    queue = kol_buy_stream.subscribe()
+    try:
+        since = request.headers.get('Last-Event-ID') or request.query.get('since')
+        sent = None  # Cursor of the newest buy this client has, so replayed buys are not queued twice
+        if since:
+            sent = parse_cursor(since)
+            if DUNE_API_KEY:
+                # After a restart the buffer is empty, and the poller only publishes what comes after it
+                await get_dune_memecoin_data('get_recent_kol_buys', {'limit': 1000}, max_age=STREAM_POLL_INTERVAL)
+            for cursor, row in reversed(recent_kol_buys.since(sent, 0)):
+                await response.write(encode_kol_buy_event(cursor, row))
+                sent = cursor
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), STREAM_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                await response.write(b": keep-alive\n\n")
+                continue
+            if item is None:
+                break
+            cursor, event = item
+            if sent is not None and not is_newer(cursor, sent):
+                continue
+            await response.write(event)
+            sent = cursor
+    except ConnectionResetError:
+        pass
+    finally:
+        kol_buy_stream.unsubscribe(queue)
+    return response
+
+@routes.get('/metrics')
+async def metrics_endpoint(request):
+    return web.Response(body=metrics.render().encode('utf-8'),
+                        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+@routes.get('/cache')
+async def cache_stats(request):
+    return json_response(request, {
+        "price_cache": coingecko.price_cache.stats(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+# Tool descriptions served at /schema; constant, so serialized once at import
+TOOL_SCHEMA = {
+    "name": "Enhanced Crypto MCP Server",
+    "description": "CoinGecko + Memecoin Radar with real API integration for ChatGPT",
+    "version": "2.0.0",
+    "tools": [
+        # CoinGecko tools
+        {
+            "name": "get_crypto_price",
+            "description": "Get current cryptocurrency prices from CoinGecko API",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Cryptocurrency IDs (e.g., ['bitcoin', 'ethereum'])"
                     },
-                    "required": []
-                }
-            },
-            {
-                "name": "get_pumpfun_graduates_by_marketcap",
-                "description": "Get Pump.fun token graduates sorted by market capitalization",
-                "inputSchema": {
-                    "type": "object", 
-                    "properties": {
-                        "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"}
+                    "vs_currencies": {
+                        "type": "array", 
+                        "items": {"type": "string"},
+                        "description": "Target currencies (e.g., ['usd', 'eur'])"
                     },
-                    "required": []
-                }
-            },
-            {
-                "name": "get_recent_kol_buys",
-                "description": "Get recent token purchases by Key Opinion Leaders (crypto influencers)",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"}
+                    "include_market_cap": {"type": "boolean"},
+                    "include_24hr_vol": {"type": "boolean"},
+                    "include_24hr_change": {"type": "boolean"}
+                },
+                "required": ["ids", "vs_currencies"]
+            }
+        },
+        {
+            "name": "get_trending_crypto",
+            "description": "Get trending cryptocurrencies from CoinGecko",
+            "inputSchema": {
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        },
+        {
+            "name": "get_market_data", 
+            "description": "Get cryptocurrency market data with filtering options",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "vs_currency": {"type": "string", "description": "Base currency (default: usd)"},
+                    "order": {"type": "string", "description": "Sort order (market_cap_desc, volume_desc, etc.)"},
+                    "per_page": {"type": "number", "description": "Results per page (max 250)"},
+                    "page": {"type": "number", "description": "Page number"},
+                    "max_results": {"type": "number", "description": "Return the top N coins in one call, fetching pages in parallel (overrides per_page; page sets the first page)"},
+                    "sparkline": {"type": "boolean", "description": "Include sparkline data"},
+                    "price_change_percentage": {"type": "string", "description": "Price change periods"}
+                },
+                "required": []
+            }
+        },
+        # Enhanced Memecoin Radar tools
+        {
+            "name": "get_trending_memecoins_by_source",
+            "description": "Get trending Solana memecoins by platform with real-time data",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "source": {
+                        "type": "string",
+                        "enum": ["Telegram", "Web", "Mobile"],
+                        "description": "Platform to query for trending tokens"
                     },
-                    "required": []
-                }
-            },
-            {
-                "name": "get_trending_tokens_on_raydium",
-                "description": "Get trending tokens on Raydium DEX with volume and liquidity data",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "time_span": {
-                            "type": "string",
-                            "enum": ["5h", "12h", "24h"],
-                            "description": "Time period for trending analysis"
-                        },
-                        "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"}
+                    "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"}
+                },
+                "required": []
+            }
+        },
+        {
+            "name": "get_pumpfun_graduates_by_marketcap",
+            "description": "Get Pump.fun token graduates sorted by market capitalization",
+            "inputSchema": {
+                "type": "object", 
+                "properties": {
+                    "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"}
+                },
+                "required": []
+            }
+        },
+        {
+            "name": "get_recent_kol_buys",
+            "description": "Get recent token purchases by Key Opinion Leaders (crypto influencers)",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"},
+                    "since": {"type": "string", "description": "Only return buys newer than this cursor ('time|tx', or a bare time to skip every buy at that time); the result carries next_cursor. Without it, every buy carries its cursor"}
+                },
+                "required": []
+            }
+        },
+        {
+            "name": "get_trending_tokens_on_raydium",
+            "description": "Get trending tokens on Raydium DEX with volume and liquidity data",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "time_span": {
+                        "type": "string",
+                        "enum": ["5h", "12h", "24h"],
+                        "description": "Time period for trending analysis"
                     },
-                    "required": []
-                }
+                    "limit": {"type": "number", "description": "Number of results (default: 100, max: 1000)"}
+                },
+                "required": []
             }
-        ]
-    })
+        }
+    ]
+}
+SCHEMA_BODY = dumps_json(TOOL_SCHEMA)
+# Weak ETag: the same representation is served under several content encodings
+SCHEMA_ETAG = 'W/"%s"' % hashlib.sha256(SCHEMA_BODY).hexdigest()[:32]
+SCHEMA_BODIES = {None: SCHEMA_BODY}
+SCHEMA_BODIES.update({name: encoder(SCHEMA_BODY) for name, encoder in CONTENT_ENCODERS.items() if encoder})
 
-@app.route('/rpc', methods=['POST'])
-def rpc_handler():
-    data = request.get_json()
+@routes.get('/schema')
+async def get_schema(request):
+    headers = {'ETag': SCHEMA_ETAG, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if etag_matches(request.headers.get('If-None-Match', ''), SCHEMA_ETAG):
+        return web.Response(status=304, headers=headers)
     
-    if not data or data.get('jsonrpc') != '2.0':
-        return jsonify({
+    encoding = None
+    if len(SCHEMA_BODY) >= COMPRESSION_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return web.Response(body=SCHEMA_BODIES[encoding], headers=headers, content_type='application/json')
+
+COINGECKO_METHODS = ('get_crypto_price', 'get_trending_crypto', 'get_market_data')
+MEMECOIN_METHODS = ('get_trending_memecoins_by_source', 'get_pumpfun_graduates_by_marketcap',
+                    'get_recent_kol_buys', 'get_trending_tokens_on_raydium')
+
+def is_valid_request(data) -> bool:
+    """Whether `data` is a well-formed JSON-RPC 2.0 request object; its method may still be unknown"""
+    return (isinstance(data, dict) and data.get('jsonrpc') == '2.0' and isinstance(data.get('method'), str)
+            and isinstance(data.get('params', []), (list, dict)))
+
+async def process_rpc_call(data, calls: dict = None):
+    """Run one JSON-RPC request object and return (http_status, response)
+
+    Inside a batch, `calls` maps (method, params) to the task already running that
+    call, so identical members share a single upstream round trip.
+    """
+    if not is_valid_request(data):
+        metrics.inc('rpc_requests_total', method='unknown', outcome='invalid_request')
+        return 400, {
             "jsonrpc": "2.0",
-            "id": data.get('id') if data else None,
+            "id": data.get('id') if isinstance(data, dict) else None,
             "error": {"code": -32600, "message": "Invalid Request"}
-        }), 400
+        }
     
     method = data.get('method')
     params = data.get('params', [{}])
@@ -607,35 +1537,81 @@ def rpc_handler():
     else:
         method_params = {}
     
+    # Route to appropriate handler
+    if method in COINGECKO_METHODS:
+        handler = handle_coingecko_method
+    elif method in MEMECOIN_METHODS:
+        handler = handle_memecoin_method
+    else:
+        metrics.inc('rpc_requests_total', method='unknown', outcome='method_not_found')
+        return 404, {
+            "jsonrpc": "2.0",
+            "id": data.get('id'),
+            "error": {"code": -32601, "message": "Method not found"}
+        }
+    
+    started = time.perf_counter()
+    outcome = 'error'
     try:
-        # Route to appropriate handler
-        if method in ['get_crypto_price', 'get_trending_crypto', 'get_market_data']:
-            result = handle_coingecko_method(method, method_params)
-        elif method in ['get_trending_memecoins_by_source', 'get_pumpfun_graduates_by_marketcap', 
-                       'get_recent_kol_buys', 'get_trending_tokens_on_raydium']:
-            result = handle_memecoin_method(method, method_params)
+        if calls is None:
+            result = await handler(method, method_params)
         else:
-            return jsonify({
-                "jsonrpc": "2.0",
-                "id": data.get('id'),
-                "error": {"code": -32601, "message": "Method not found"}
-            }), 404
+            key = (method, json.dumps(method_params, sort_keys=True, default=str))
+            if key not in calls:
+                calls[key] = asyncio.ensure_future(handler(method, method_params))
+            result = await asyncio.shield(calls[key])
         
-        return jsonify({
+        outcome = 'ok'
+        return 200, {
             "jsonrpc": "2.0",
             "id": data.get('id'),
             "result": result
-        })
+        }
         
     except Exception as e:
         print(f"RPC error for method {method}: {e}")
-        return jsonify({
+        return 500, {
             "jsonrpc": "2.0",
             "id": data.get('id'),
             "error": {"code": -32603, "message": "Internal error", "data": str(e)}
-        }), 500
+        }
+    finally:
+        metrics.inc('rpc_requests_total', method=method, outcome=outcome)
+        metrics.observe('rpc_request_duration_seconds', time.perf_counter() - started, method=method)
+
+async def process_rpc_batch(batch: list):
+    """Run every member of a batch concurrently, returning responses in request order
+
+    Notifications (valid members without an "id") are executed but get no response
+    entry; invalid members always get an Invalid Request error.
+    """
+    calls = {}
+    responses = await asyncio.gather(*(process_rpc_call(data, calls) for data in batch))
+    return [response for data, (_, response) in zip(batch, responses)
+            if not is_valid_request(data) or 'id' in data]
+
+@routes.post('/rpc')
+async def rpc_handler(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        metrics.inc('rpc_requests_total', method='unknown', outcome='parse_error')
+        return json_response(request, {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {"code": -32700, "message": "Parse error"}
+        }, 400)
+    
+    if isinstance(data, list) and data:
+        responses = await process_rpc_batch(data)
+        if not responses:
+            return web.Response(status=204)
+        return json_response(request, responses)
+    
+    status, response = await process_rpc_call(data)
+    return json_response(request, response, status)
 
-def handle_coingecko_method(method: str, params: dict):
+async def handle_coingecko_method(method: str, params: dict):
     """Handle CoinGecko API methods with real API calls"""
     
     if method == "get_crypto_price":
@@ -654,22 +1630,89 @@ def handle_coingecko_method(method: str, params: dict):
         if params.get('include_24hr_change'):
             options['include_24hr_change'] = 'true'
         
-        return coingecko.get_simple_price(ids, vs_currencies, **options)
+        return await coingecko.get_simple_price(ids, vs_currencies, **options)
     
     elif method == "get_trending_crypto":
-        return coingecko.get_trending()
+        return await coingecko.get_trending()
     
     elif method == "get_market_data":
         vs_currency = params.get('vs_currency', 'usd')
-        options = {k: v for k, v in params.items() if k != 'vs_currency'}
-        return coingecko.get_coins_markets(vs_currency, **options)
+        options = {k: v for k, v in params.items() if k not in ('vs_currency', 'max_results')}
+        if params.get('max_results'):
+            return await coingecko.get_top_coins_markets(vs_currency, int(params['max_results']), **options)
+        return await coingecko.get_coins_markets(vs_currency, **options)
     
     else:
         raise ValueError(f"Unknown CoinGecko method: {method}")
 
-def handle_memecoin_method(method: str, params: dict):
+async def handle_memecoin_method(method: str, params: dict):
     """Handle memecoin radar methods with Dune Analytics integration"""
-    return get_memecoin_data(method, params)
+    return await get_memecoin_data(method, params)
+
+@web.middleware
+async def cors_middleware(request, handler):
+    """Answer CORS preflight requests directly"""
+    if request.method == 'OPTIONS':
+        return web.Response()
+    return await handler(request)
+
+async def add_cors_headers(request, response):
+    """Allow cross-origin requests from any origin; runs before headers are sent, so it covers streams too"""
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
+    response.headers['Access-Control-Allow-Headers'] = request.headers.get('Access-Control-Request-Headers', '*')
+
+@web.middleware
+async def metrics_middleware(request, handler):
+    """Count and time every request under its route pattern"""
+    resource = request.match_info.route.resource
+    route = resource.canonical if resource is not None else 'unmatched'
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        metrics.inc('http_requests_total', route=route, method=request.method, status=status)
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started, route=route)
+
+def cache_metrics():
+    stats = coingecko.price_cache.stats()
+    return [
+        ('price_cache_lookups_total', 'counter', 'Price cache cell lookups by result',
+         {(('result', 'hit'),): stats['hits'], (('result', 'miss'),): stats['misses']}),
+        ('price_cache_hit_ratio', 'gauge', 'Share of price cache cell lookups served from cache',
+         {(): stats['hit_ratio'] or 0}),
+        ('price_cache_entries', 'gauge', 'Cells currently held in the price cache', {(): stats['entries']}),
+        ('price_cache_evictions_total', 'counter', 'Price cache cells dropped by LRU eviction', {(): stats['evictions']}),
+        ('stream_clients', 'gauge', 'Connected KOL buy stream clients', {(): kol_buy_stream.stats()['clients']}),
+        ('stream_events_total', 'counter', 'KOL buy events published to the stream', {(): kol_buy_stream.events}),
+        ('stream_dropped_clients_total', 'counter', 'Stream clients disconnected for falling behind', {(): kol_buy_stream.dropped}),
+        ('circuit_open', 'gauge', 'Whether an upstream circuit is open (1), half-open (0.5) or closed (0)',
+         {(('upstream', circuit.name),): {'closed': 0, 'half_open': 0.5, 'open': 1}[circuit.state]
+          for circuit in (coingecko.circuit, dune.circuit)})
+    ]
+
+metrics.collect(cache_metrics)
+
+async def close_streams(app):
+    kol_buy_stream.close()
+
+async def close_upstream_sessions(app):
+    await coingecko.close()
+    await dune.close()
+
+def create_app() -> web.Application:
+    app = web.Application(middlewares=[metrics_middleware, cors_middleware])
+    app.add_routes(routes)
+    app.on_response_prepare.append(add_cors_headers)
+    app.on_shutdown.append(close_streams)
+    app.on_cleanup.append(close_upstream_sessions)
+    return app
 
 if __name__ == '__main__':
     print(f"🚀 Enhanced Crypto MCP Server starting on port {PORT}")
@@ -678,4 +1721,4 @@ if __name__ == '__main__':
     print(f"🌐 Server URL: http://0.0.0.0:{PORT}")
     print(f"✨ Data Quality: {'Live APIs' if (COINGECKO_API_KEY and DUNE_API_KEY) else 'Mixed (some mock data)'}")
     
-    app.run(host='0.0.0.0', port=PORT, debug=False)
+    web.run_app(create_app(), host='0.0.0.0', port=PORT, print=None)
@@ -0,0 +1,114 @@
+"""
+Dune result rows shared by main.py and combined_server.py: timestamps, cursors and
+the recent-row buffer that answers `since` requests.
+"""
+
+from collections import deque
+from datetime import datetime
+import hashlib
+import json
+
+
+def parse_timestamp(value):
+    """
+    Convert a Dune timestamp such as '2025-06-14T10:00:00.123456789Z' to epoch seconds.
+
+    Args:
+        value (str): ISO 8601 timestamp as returned by the Dune API.
+
+    Returns:
+        float: Seconds since the epoch, or None if the value is missing or malformed.
+    """
+    if not value:
+        return None
+    head, _, fraction = value.rstrip("Z").partition(".")
+    try:
+        parsed = datetime.fromisoformat(head + "+00:00")
+    except ValueError:
+        return None
+    digits = "".join(c for c in fraction if c.isdigit())[:6]
+    return parsed.timestamp() + (int(digits) / 10 ** len(digits) if digits else 0)
+
+def format_cursor(cursor: tuple) -> str:
+    return f"{cursor[0]}|{cursor[1]}"
+
+def parse_cursor(value: str) -> tuple:
+    """
+    Split a 'time|tx' cursor.
+
+    A bare time has no tx (None): every row at that time counts as already seen.
+    """
+    row_time, separator, tx = value.partition("|")
+    return row_time, tx if separator else None
+
+def is_newer(cursor: tuple, since: tuple) -> bool:
+    """Whether a row's `cursor` is newer than `since`, which may be a bare time (tx None)."""
+    return cursor[0] > since[0] if since[1] is None else cursor > since
+
+class RecentRows:
+    """
+    Ring buffer of the newest rows of a time-ordered query, merged from every fetch.
+
+    Rows are ordered by a `(time, tx)` cursor, where `tx` is the row's transaction hash
+    or, for rows without one, a fingerprint of the whole row. `tx_field` is a field name
+    or a function of the row, e.g. one that decodes the mint from a link field. Reading
+    the rows newer than a cursor walks back from the newest end, so it costs as much as
+    the new rows. Rows arriving with a time older than the newest buffered row are still
+    merged in order, but callers whose cursor is already past them will not see them.
+    """
+
+    def __init__(self, time_field: str, tx_field, max_rows: int):
+        self.time_field = time_field
+        self.tx_field = tx_field
+        self.max_rows = max_rows
+        self._rows = deque(maxlen=max_rows)  # (cursor, row), oldest first
+        self._seen = set()
+        self._last_merged = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def cursor(self, row: dict) -> tuple:
+        tx = self.tx_field(row) if callable(self.tx_field) else row.get(self.tx_field)
+        if tx is None:
+            tx = hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode()).hexdigest()[:16]
+        return str(row.get(self.time_field, "")), str(tx)
+
+    def merge(self, rows: list) -> int:
+        """Add the rows not seen before and return how many were added."""
+        if rows is self._last_merged:
+            return 0  # The same reused result again
+        self._last_merged = rows
+        fresh = []
+        for row in rows:
+            cursor = self.cursor(row)
+            if cursor not in self._seen:
+                self._seen.add(cursor)
+                fresh.append((cursor, row))
+        if not fresh:
+            return 0
+        fresh.sort(key=lambda item: item[0])
+        if self._rows and fresh[0][0] < self._rows[-1][0]:
+            self._rows = deque(sorted([*self._rows, *fresh], key=lambda item: item[0]), maxlen=self.max_rows)
+        else:
+            self._rows.extend(fresh)
+        if len(self._seen) > 2 * self.max_rows:
+            self._seen = {cursor for cursor, _ in self._rows}
+        return len(fresh)
+
+    def since(self, cursor: tuple, limit: int) -> list:
+        """Return up to `limit` of the oldest `(cursor, row)` pairs newer than `cursor`, newest first."""
+        newer = []
+        for item in reversed(self._rows):
+            if not is_newer(item[0], cursor):
+                break
+            newer.append(item)
+        return newer[-limit:] if limit > 0 else newer
+
+    def latest(self, limit: int) -> list:
+        """Return the newest `limit` `(cursor, row)` pairs, newest first."""
+        return [self._rows[-i] for i in range(1, min(limit, len(self._rows)) + 1)]
+
+    def newest_cursor(self, default: str = "0") -> str:
+        """Return the newest row's formatted cursor, or `default` if the buffer is empty."""
+        return format_cursor(self._rows[-1][0]) if self._rows else default
@@ -1,7 +1,22 @@
 from mcp.server.fastmcp import FastMCP
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, Callable, NamedTuple
+import asyncio
+import heapq
+import importlib.util
+import inspect
+import json
+import marshal
+import random
+import sqlite3
+import sys
+import threading
 import httpx
 import os
 from dotenv import load_dotenv
+from dune_rows import RecentRows, format_cursor, parse_cursor, parse_timestamp
 import time
 import re
 from tabulate import tabulate
@@ -9,52 +24,1041 @@ from tabulate import tabulate
 # Load environment variables
 load_dotenv()
 
+# Configuration
+DUNE_API_KEY = os.getenv("DUNE_API_KEY")
+BASE_URL = "https://api.dune.com/api/v1"
+HEADERS = {"X-Dune-API-Key": DUNE_API_KEY}
+
+# Connection pool shared by every tool call against api.dune.com
+DUNE_MAX_CONNECTIONS = int(os.getenv("DUNE_MAX_CONNECTIONS", 20))
+DUNE_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("DUNE_MAX_KEEPALIVE_CONNECTIONS", 10))
+DUNE_KEEPALIVE_EXPIRY = float(os.getenv("DUNE_KEEPALIVE_EXPIRY", 60))
+# HTTP/2 needs the optional `h2` package (`httpx[http2]`); fall back to HTTP/1.1 without it
+DUNE_HTTP2 = os.getenv("DUNE_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+# Rows requested per page; larger results are fetched page by page
+DUNE_PAGE_SIZE = int(os.getenv("DUNE_PAGE_SIZE", 1000))
+
+# Result cache: entries expire `ttl` seconds after Dune last executed the query,
+# but never sooner than RADAR_CACHE_MIN_TTL seconds after they were fetched (doubled,
+# up to the TTL, each time a refetch finds the same execution)
+RADAR_CACHE_TTL = int(os.getenv("RADAR_CACHE_TTL", 300))
+RADAR_CACHE_MIN_TTL = int(os.getenv("RADAR_CACHE_MIN_TTL", 30))
+RADAR_CACHE_MAX_ENTRIES = int(os.getenv("RADAR_CACHE_MAX_ENTRIES", 128))
+# Each query is fetched once with this many rows and smaller limits are sliced from it (0 disables)
+RADAR_FETCH_ROWS = int(os.getenv("RADAR_FETCH_ROWS", 1000))
+
+# Expired entries are still served for this many seconds while a refresh runs in the background
+RADAR_CACHE_STALE_TTL = int(os.getenv("RADAR_CACHE_STALE_TTL", 3600))
+
+# On-disk snapshots of cached results, so a restarted server can answer from disk ("" disables)
+RADAR_SNAPSHOT_PATH = os.getenv(
+    "RADAR_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".radar_snapshots.sqlite3"),
+)
+RADAR_SNAPSHOT_MAX_BYTES = int(os.getenv("RADAR_SNAPSHOT_MAX_BYTES", 64 * 1024 * 1024))
+
+# Decoded (label, href) pairs kept for repeated token and KOL links
+RADAR_ANCHOR_CACHE_SIZE = int(os.getenv("RADAR_ANCHOR_CACHE_SIZE", 8192))
+
+# Newest rows kept per cursor-enabled query for `since` (delta) requests
+RADAR_CURSOR_BUFFER_ROWS = int(os.getenv("RADAR_CURSOR_BUFFER_ROWS", 5000))
+
+# Newest rows returned when a feed resource is read, and seconds allowed per notification
+RADAR_FEED_ROWS = int(os.getenv("RADAR_FEED_ROWS", 100))
+RADAR_FEED_SEND_TIMEOUT = float(os.getenv("RADAR_FEED_SEND_TIMEOUT", 5))
+
+# Background refresher that keeps every known query warm
+RADAR_REFRESH = os.getenv("RADAR_REFRESH", "1") == "1"
+RADAR_REFRESH_CONCURRENCY = int(os.getenv("RADAR_REFRESH_CONCURRENCY", 4))
+RADAR_REFRESH_JITTER = float(os.getenv("RADAR_REFRESH_JITTER", 0.1))
+
+# Dune queries behind the tools
+TRENDING_BY_SOURCE_QUERY_IDS = {
+    "Telegram": 4830187,
+    "Web": 4830192,
+    "Mobile": 4930328,
+}
+PUMPFUN_GRADUATES_BY_MARKETCAP_QUERY_ID = 4124453
+PUMPFUN_GRADUATES_BY_VOLUME_QUERY_ID = 4832613
+RECENT_PUMPFUN_GRADUATES_QUERY_ID = 4832245
+RECENT_KOL_BUYS_QUERY_ID = 4832844
+KOL_TRADING_VOLUME_QUERY_ID = 4838351
+RAYDIUM_QUERY_IDS = {
+    "5h": 4840714,
+    "12h": 4840651,
+    "24h": 4840709,
+}
+PUMPSWAP_QUERY_IDS = {
+    "5h": 4929624,
+    "12h": 4929617,
+    "24h": 4929607,
+}
+
+# Every known query, keyed by ID, with the dataset name shown in the health view (filled by register_tool)
+RADAR_QUERIES = {}
+
+# Per-query TTLs for queries that refresh faster than RADAR_CACHE_TTL (filled by register_tool)
+QUERY_TTLS = {}
+
+# Recent-row buffers of queries that accept a `since` cursor (filled by register_tool)
+ROW_BUFFERS = {}
+
+# Subscribable feed resource URI per query ID (filled by register_feed)
+FEEDS = {}
+
+# Output formats of lookup_token, which groups rows from differently shaped datasets
+LOOKUP_OUTPUT_FORMATS = ("table", "markdown", "json")
+
+_client = None
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide Dune HTTP client, creating it on first use.
+
+    The client keeps connections alive between tool calls, so only the first request
+    pays for DNS, TCP and TLS setup.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=DUNE_HTTP2,
+            timeout=300,
+            limits=httpx.Limits(
+                max_connections=DUNE_MAX_CONNECTIONS,
+                max_keepalive_connections=DUNE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=DUNE_KEEPALIVE_EXPIRY,
+            ),
+        )
+    return _client
+
+# Sessions currently inside `lifespan`, and the refresher tasks they share
+_sessions = 0
+_refresher_tasks = []
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """
+    Run the background refresher while any session is open; close the HTTP client after the last.
+
+    FastMCP enters the lifespan once per session on the SSE and streamable-HTTP transports,
+    so the first session starts the refresher and the last one to end stops it.
+    """
+    global _sessions, _refresher_tasks
+    _sessions += 1
+    if _sessions == 1 and RADAR_REFRESH:
+        _refresher_tasks = start_refresher()
+    try:
+        yield
+    finally:
+        _sessions -= 1
+        if _sessions == 0:
+            tasks, _refresher_tasks = _refresher_tasks, []
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # A session opened while the refresher stopped is already using the client
+            if _sessions == 0 and _client is not None:
+                await _client.aclose()
+
 # Initialize MCP server
 mcp = FastMCP(
     name="Memecoin Radar",
-    dependencies=["httpx", "python-dotenv", "tabulate"]
+    dependencies=["httpx", "python-dotenv", "tabulate"],
+    lifespan=lifespan
 )
 
-# Configuration
-DUNE_API_KEY = os.getenv("DUNE_API_KEY")
-BASE_URL = "https://api.dune.com/api/v1"
-HEADERS = {"X-Dune-API-Key": DUNE_API_KEY}
+class CacheEntry(NamedTuple):
+    rows: list
+    fetched_at: float
+    expires_at: float
+    execution_ended_at: float
 
-def get_latest_result(query_id: int, limit: int = 1000):
+class SnapshotStore:
     """
-    Fetch the latest results from a Dune Analytics query.
+    SQLite file holding the latest cached rows for each cache key.
+
+    Rows are stored as `marshal` blobs, which load straight back into Python objects
+    without a JSON parsing pass. Blobs written by a different Python version are
+    ignored. Each key keeps one row that is overwritten on every fetch, and the
+    oldest snapshots are dropped once the file grows past `max_bytes`.
+    """
+
+    FORMAT = f"marshal/{sys.version_info[0]}.{sys.version_info[1]}/{marshal.version}"
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.errors = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS snapshots ("
+                "query_id INTEGER, row_limit INTEGER, fetched_at REAL, execution_ended_at REAL, "
+                "format TEXT, rows BLOB, PRIMARY KEY (query_id, row_limit))"
+            )
+        return self._conn
+
+    def load(self, key):
+        """
+        Read the snapshot stored for `key`.
+
+        Args:
+            key (tuple): Cache key `(query_id, limit)`.
+
+        Returns:
+            tuple: `(rows, fetched_at, execution_ended_at)`, or None if there is no usable snapshot.
+        """
+        try:
+            with self._lock:
+                record = self._connect().execute(
+                    "SELECT rows, fetched_at, execution_ended_at FROM snapshots "
+                    "WHERE query_id = ? AND row_limit = ? AND format = ?",
+                    (*key, self.FORMAT),
+                ).fetchone()
+            if record is None:
+                return None
+            return marshal.loads(record[0]), record[1], record[2]
+        except (sqlite3.Error, ValueError, EOFError, TypeError):
+            self.errors += 1
+            return None
+
+    def save(self, key, rows: list, fetched_at: float, execution_ended_at: float = None):
+        """Write the snapshot for `key`, then drop the oldest snapshots if the store is over its cap."""
+        try:
+            blob = marshal.dumps(rows)
+            with self._lock:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, fetched_at, execution_ended_at, self.FORMAT, blob),
+                )
+                self._compact(conn)
+        except (sqlite3.Error, ValueError):
+            self.errors += 1
+
+    def _compact(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(LENGTH(rows)), 0) FROM snapshots").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for query_id, row_limit, size in conn.execute(
+            "SELECT query_id, row_limit, LENGTH(rows) FROM snapshots ORDER BY fetched_at"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM snapshots WHERE query_id = ? AND row_limit = ?", (query_id, row_limit))
+            total -= size
+        conn.execute("VACUUM")
+
+class ResultCache:
+    """
+    LRU cache of Dune query results.
+
+    Entries expire on a per-query TTL measured from the upstream execution time, and
+    concurrent misses for the same key share a single upstream request. Expired entries
+    are served for up to `stale_ttl` more seconds while a background refresh runs.
+    With a `store`, every fetch is also written to disk and a key missing from memory
+    is restored from its snapshot before going upstream. `on_restore(key, rows)` is
+    called with every restored result, so it can be indexed like a fetched one.
+    """
+
+    def __init__(self, max_entries: int, stale_ttl: int = 0, store: SnapshotStore = None,
+                 on_restore: Callable = None):
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.store = store
+        self.on_restore = on_restore
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.restored = 0
+
+    async def get(self, key, fetch, ttl: int):
+        """
+        Return cached rows for `key`, calling `fetch()` on a miss or after expiry.
+
+        Args:
+            key: Cache key, e.g. `(query_id, limit)`.
+            fetch: Coroutine function returning `(rows, execution_ended_at)`.
+            ttl (int): Seconds the result stays fresh after the upstream execution ended.
+
+        Returns:
+            list: The cached or freshly fetched rows.
+        """
+        entry = await self.restore(key, ttl)
+        if entry is not None:
+            now = time.time()
+            if entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.rows
+            if entry.expires_at + self.stale_ttl > now:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_load(key, fetch, ttl)
+                return entry.rows
+            del self._entries[key]
+            self.expirations += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._start_load(key, fetch, ttl)
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the fetch other callers are waiting on
+        return await asyncio.shield(task)
+
+    async def refresh(self, key, fetch, ttl: int):
+        """Fetch `key` again regardless of its expiry, joining a fetch already in flight."""
+        task = self._inflight.get(key) or self._start_load(key, fetch, ttl)
+        return await asyncio.shield(task)
+
+    async def restore(self, key, ttl: int):
+        """
+        Return the entry for `key`, loading it from the snapshot store if it is not in memory.
+
+        A snapshot is read even while a fetch for `key` is in flight, so callers are not
+        kept waiting on Dune when the disk already holds a usable result.
+
+        Returns:
+            CacheEntry: The entry, or None if neither memory nor disk has one.
+        """
+        entry = self._entries.get(key)
+        if entry is not None or self.store is None:
+            return entry
+        snapshot = await asyncio.to_thread(self.store.load, key)
+        # A fetch that finished while the snapshot was read holds newer rows
+        entry = self._entries.get(key)
+        if entry is not None or snapshot is None:
+            return entry
+        rows, fetched_at, ended_at = snapshot
+        self.restored += 1
+        entry = self.put(key, rows, ttl, ended_at, fetched_at)
+        if self.on_restore is not None:
+            self.on_restore(key, rows)
+        return entry
+
+    def peek(self, key):
+        """Return the entry for `key` without counting a lookup, or None."""
+        return self._entries.get(key)
+
+    def _start_load(self, key, fetch, ttl: int):
+        task = asyncio.ensure_future(self._load(key, fetch, ttl))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish_load(key, t))
+        return task
+
+    def _finish_load(self, key, task):
+        self._inflight.pop(key, None)
+        # Background refreshes have no waiter, so retrieve the error to keep asyncio quiet
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    async def _load(self, key, fetch, ttl: int):
+        rows, ended_at = await fetch()
+        entry = self.put(key, rows, ttl, ended_at)
+        if self.store is not None:
+            await asyncio.to_thread(self.store.save, key, rows, entry.fetched_at, ended_at)
+        return rows
+
+    def put(self, key, rows: list, ttl: int, execution_ended_at: float = None, fetched_at: float = None):
+        """
+        Store rows under `key`, evicting the least recently used entries if full.
+
+        An entry whose upstream execution is already older than `ttl` is kept for
+        RADAR_CACHE_MIN_TTL seconds; each refetch that finds the same execution doubles
+        that delay, up to `ttl`.
+
+        Returns:
+            CacheEntry: The stored entry.
+        """
+        if fetched_at is None:
+            fetched_at = time.time()
+        expires_at = fetched_at + ttl
+        if execution_ended_at is not None:
+            min_ttl = RADAR_CACHE_MIN_TTL
+            previous = self._entries.get(key)
+            if previous is not None and previous.execution_ended_at == execution_ended_at:
+                # Dune has not re-run the query since the last fetch, so back off instead of
+                # downloading the same rows again every RADAR_CACHE_MIN_TTL seconds
+                min_ttl = min(max(2 * (previous.expires_at - previous.fetched_at), RADAR_CACHE_MIN_TTL), ttl)
+            expires_at = min(expires_at, max(execution_ended_at + ttl, fetched_at + min_ttl))
+        entry = self._entries[key] = CacheEntry(rows, fetched_at, expires_at, execution_ended_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def stats(self) -> dict:
+        """Return cache counters and the current hit ratio."""
+        served = self.hits + self.stale_hits + self.coalesced
+        lookups = served + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "failures": self.failures,
+            "restored_from_disk": self.restored,
+            "snapshot_errors": self.store.errors if self.store else 0,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        }
+
+result_cache = ResultCache(
+    RADAR_CACHE_MAX_ENTRIES,
+    RADAR_CACHE_STALE_TTL,
+    SnapshotStore(RADAR_SNAPSHOT_PATH, RADAR_SNAPSHOT_MAX_BYTES) if RADAR_SNAPSHOT_PATH else None,
+    on_restore=lambda key, rows: index_result(key[0], rows),
+)
+
+class FeedHub:
+    """
+    Resource subscriptions of connected MCP sessions.
+
+    A refresh that merges new rows into a feed's buffer calls `notify` once; every
+    subscribed session then gets a `notifications/resources/updated` for the feed's
+    URI, sent concurrently and bounded by RADAR_FEED_SEND_TIMEOUT so that one slow
+    client cannot hold up the others. Sessions that fail to receive are dropped.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # uri -> set of sessions
+        self._sends = set()
+        self.notifications = 0
+        self.dropped = 0
+
+    def subscribe(self, uri: str, session):
+        self._subscribers.setdefault(uri, set()).add(session)
+
+    def unsubscribe(self, uri: str, session):
+        self._subscribers.get(uri, set()).discard(session)
+
+    def notify(self, uri: str):
+        """Schedule an update notification for every subscriber of `uri`."""
+        if self._subscribers.get(uri):
+            task = asyncio.ensure_future(self._publish(uri))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _publish(self, uri: str):
+        sessions = list(self._subscribers.get(uri, ()))
+        results = await asyncio.gather(
+            *(asyncio.wait_for(session.send_resource_updated(uri), RADAR_FEED_SEND_TIMEOUT) for session in sessions),
+            return_exceptions=True,
+        )
+        for session, result in zip(sessions, results):
+            if isinstance(result, BaseException):
+                self.unsubscribe(uri, session)
+                self.dropped += 1
+            else:
+                self.notifications += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": {uri: len(sessions) for uri, sessions in self._subscribers.items()},
+            "notifications": self.notifications,
+            "dropped": self.dropped,
+        }
+
+feed_hub = FeedHub()
+
+class IndexedSource(NamedTuple):
+    """How to read and render one query's rows in the token index."""
+    dataset: str
+    mint: Callable
+    headers: list
+    keys: list
+    numeric: list
+    project: Callable
+    typed_project: Callable
+
+class TokenIndex:
+    """
+    The latest rows of every query, keyed by mint address.
+
+    Indexing a query's result replaces only the rows that query contributed before, so a
+    refresh costs as much as that query's rows and a lookup is a single dict access.
+    Results already indexed (the same cached list) are skipped.
+    """
+
+    def __init__(self):
+        self.sources = {}  # query_id -> IndexedSource
+        self._indexed = {}  # query_id -> result last indexed
+        self._mints = {}  # query_id -> mints it contributed
+        self._rows = {}  # mint -> {query_id: [row, ...]}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add_source(self, query_id: int, source: IndexedSource):
+        self.sources[query_id] = source
+
+    def update(self, query_id: int, rows: list):
+        """Replace the rows indexed for `query_id` with `rows`."""
+        source = self.sources.get(query_id)
+        if source is None or rows is self._indexed.get(query_id):
+            return
+        for mint in self._mints.pop(query_id, ()):
+            by_query = self._rows[mint]
+            del by_query[query_id]
+            if not by_query:
+                del self._rows[mint]
+        mints = set()
+        for row in rows:
+            try:
+                mint = source.mint(row)
+            except (KeyError, TypeError, AttributeError):
+                continue
+            if mint:
+                self._rows.setdefault(mint, {}).setdefault(query_id, []).append(row)
+                mints.add(mint)
+        self._mints[query_id] = mints
+        self._indexed[query_id] = rows
+
+    def lookup(self, mint: str) -> dict:
+        """Return the indexed rows of `mint` by query ID."""
+        return self._rows.get(mint, {})
+
+token_index = TokenIndex()
+
+async def iter_result_pages(query_id: int, limit: int = 1000):
+    """
+    Fetch the latest results from a Dune Analytics query one page at a time.
+
+    The first page comes from the query's latest result. Later pages are read from the
+    same execution, following Dune's `next_offset`, so a refresh that lands mid-way
+    cannot mix two executions. Only one page is held in memory at a time.
 
     Args:
         query_id (int): The ID of the Dune query to fetch results from.
         limit (int, optional): Maximum number of rows to return. Defaults to 1000.
 
-    Returns:
-        list: A list of dictionaries containing the query results, or an empty list if the request fails.
+    Yields:
+        tuple: The rows of one page and the upstream `execution_ended_at` as epoch seconds (or None).
 
     Raises:
         httpx.HTTPStatusError: If the API request fails due to a client or server error.
     """
+    client = get_client()
     url = f"{BASE_URL}/query/{query_id}/results"
-    params = {"limit": limit}
-    with httpx.Client() as client:
-        response = client.get(url, params=params, headers=HEADERS, timeout=300)
+    params = {"limit": min(limit, DUNE_PAGE_SIZE) if limit > 0 else limit}
+    remaining = limit
+    while True:
+        response = await client.get(url, params=params, headers=HEADERS)
         response.raise_for_status()
         data = response.json()
-        
-    result_data = data.get("result", {}).get("rows", [])
-    return result_data
-    
-def strip_a_tag(html):
-    match = re.search(r'>(.*?)</a>', html)
-    return match.group(1) if match else html
+        rows = data.get("result", {}).get("rows", [])
+        yield rows, parse_timestamp(data.get("execution_ended_at"))
+
+        remaining -= len(rows)
+        next_offset = data.get("next_offset")
+        if limit <= 0 or remaining <= 0 or not rows or next_offset is None:
+            return
+        url = f"{BASE_URL}/execution/{data['execution_id']}/results"
+        params = {"limit": min(remaining, DUNE_PAGE_SIZE), "offset": next_offset}
+
+async def fetch_latest_result(query_id: int, limit: int = 1000):
+    """
+    Fetch the latest results from a Dune Analytics query, bypassing the cache.
+
+    Args:
+        query_id (int): The ID of the Dune query to fetch results from.
+        limit (int, optional): Maximum number of rows to return. Defaults to 1000.
+
+    Returns:
+        tuple: The result rows and the upstream `execution_ended_at` as epoch seconds (or None).
+
+    Raises:
+        httpx.HTTPStatusError: If the API request fails due to a client or server error.
+    """
+    result_data = []
+    ended_at = None
+    async for rows, page_ended_at in iter_result_pages(query_id, limit):
+        result_data.extend(rows)
+        ended_at = ended_at or page_ended_at
+    index_result(query_id, result_data)
+    return result_data, ended_at
+
+def index_result(query_id: int, rows: list):
+    """Merge a whole fetched or restored result into the query's row buffer and the token index."""
+    if query_id in ROW_BUFFERS and ROW_BUFFERS[query_id].merge(rows) and query_id in FEEDS:
+        feed_hub.notify(FEEDS[query_id])
+    token_index.update(query_id, rows)
+
+async def get_latest_result(query_id: int, limit: int = 1000):
+    """
+    Fetch the latest results from a Dune Analytics query.
+
+    Results are served from the in-process cache while fresh. Any `limit` up to
+    RADAR_FETCH_ROWS is answered from a single cached fetch of RADAR_FETCH_ROWS rows,
+    so different limits on the same query share one upstream request.
+
+    Args:
+        query_id (int): The ID of the Dune query to fetch results from.
+        limit (int, optional): Maximum number of rows to return. Defaults to 1000.
+
+    Returns:
+        list: A list of dictionaries containing the query results, or an empty list if the request fails.
+
+    Raises:
+        httpx.HTTPStatusError: If the API request fails due to a client or server error.
+    """
+    ttl = QUERY_TTLS.get(query_id, RADAR_CACHE_TTL)
+    fetch_limit = RADAR_FETCH_ROWS if 0 < limit <= RADAR_FETCH_ROWS else limit
+    rows = await result_cache.get(
+        (query_id, fetch_limit),
+        lambda: fetch_latest_result(query_id, fetch_limit),
+        ttl,
+    )
+    return rows[:limit] if fetch_limit != limit else rows
+
+async def get_rows_since(query_id: int, since: str, limit: int = 100):
+    """
+    Fetch the rows of a cursor-enabled query that are newer than `since`.
+
+    The query's cached result is brought up to date first, so every fetch is merged into
+    its recent-row buffer; the answer is then read from the buffer alone.
+
+    Args:
+        query_id (int): The ID of a Dune query registered with a cursor.
+        since (str): The last cursor the caller has seen, as 'time|tx' or a bare time.
+        limit (int, optional): Maximum number of rows to return. Defaults to 100.
+
+    Returns:
+        list: `(cursor, row)` pairs, newest first; the first cursor is the next one to pass.
+
+    Raises:
+        httpx.HTTPStatusError: If the Dune API request fails.
+    """
+    buffer = await get_row_buffer(query_id)
+    return buffer.since(parse_cursor(since), limit)
+
+async def get_row_buffer(query_id: int) -> RecentRows:
+    """Bring a cursor-enabled query's cached result up to date and return its row buffer."""
+    await get_latest_result(query_id, limit=RADAR_FETCH_ROWS or 1000)
+    return ROW_BUFFERS[query_id]
+
+# Last refresh outcome per query ID, shown in the health view
+refresh_status = {}
+
+async def refresh_query(query_id: int, semaphore: asyncio.Semaphore):
+    """
+    Keep one query warm in the result cache for as long as the server runs.
+
+    The query is refetched shortly before its cache entry expires, with jitter so that
+    queries sharing a TTL do not refresh in lockstep. A result restored from disk is
+    served until it expires, so a restart does not refetch every query. Failures are
+    retried on the minimum TTL while the stale entry keeps being served.
+
+    Args:
+        query_id (int): The ID of the Dune query to refresh.
+        semaphore (asyncio.Semaphore): Caps how many refreshes hit Dune at once.
+    """
+    ttl = QUERY_TTLS.get(query_id, RADAR_CACHE_TTL)
+    key = (query_id, RADAR_FETCH_ROWS)
+    status = refresh_status.setdefault(query_id, {"refreshes": 0, "failures": 0, "last_error": None})
+    entry = await result_cache.restore(key, ttl)
+    if entry is not None:
+        await sleep_with_jitter(entry.expires_at - time.time())
+    while True:
+        async with semaphore:
+            try:
+                await result_cache.refresh(key, lambda: fetch_latest_result(query_id, RADAR_FETCH_ROWS), ttl)
+                status["refreshes"] += 1
+                status["last_error"] = None
+            except Exception as e:
+                status["failures"] += 1
+                status["last_error"] = str(e)
+        entry = result_cache.peek(key)
+        if status["last_error"] is None and entry is not None:
+            delay = max(entry.expires_at - time.time(), RADAR_CACHE_MIN_TTL)
+        else:
+            delay = RADAR_CACHE_MIN_TTL
+        await sleep_with_jitter(delay)
+
+async def sleep_with_jitter(delay: float):
+    """Sleep for `delay` seconds give or take RADAR_REFRESH_JITTER; negative delays return at once."""
+    if delay > 0:
+        await asyncio.sleep(delay * random.uniform(1 - RADAR_REFRESH_JITTER, 1 + RADAR_REFRESH_JITTER))
+
+def start_refresher() -> list:
+    """
+    Start one refresh task per known query.
+
+    Returns:
+        list: The started tasks, or an empty list when RADAR_FETCH_ROWS is 0 and
+            there is no single cache key per query to keep warm.
+    """
+    if RADAR_FETCH_ROWS <= 0:
+        return []
+    semaphore = asyncio.Semaphore(RADAR_REFRESH_CONCURRENCY)
+    return [asyncio.create_task(refresh_query(query_id, semaphore)) for query_id in RADAR_QUERIES]
     
-def a_tag_link(html):
-    match = re.search(r'href="([^"]+)"', html)
-    return match.group(1) if match else html
+ANCHOR_LABEL_PATTERN = re.compile(r'>(.*?)</a>')
+ANCHOR_HREF_PATTERN = re.compile(r'href="([^"]+)"')
 
-@mcp.tool()
-def get_trending_tokens_by_source(source: str = "Telegram", limit: int = 100) -> str:
-    """Retrieve top traded tokens on specified source platform in the last 12 hours.
+@lru_cache(maxsize=RADAR_ANCHOR_CACHE_SIZE)
+def parse_anchor(html):
+    """
+    Split an HTML link such as '<a href="url">label</a>' into its label and href.
+
+    The common case is handled with plain string scanning; unusual markup falls back
+    to the regular expressions. Results are memoized because the same token and KOL
+    links appear in many rows and across queries.
+
+    Args:
+        html (str): The `*_with_chart` / `*_with_link` field from a Dune row.
+
+    Returns:
+        tuple: `(label, href)`, where either part is the input itself if it cannot be found.
+    """
+    start = html.find(">")
+    end = html.find("</a>", start + 1) if start >= 0 else -1
+    if end >= 0 and "\n" not in html[start:end]:
+        label = html[start + 1:end]
+    else:
+        match = ANCHOR_LABEL_PATTERN.search(html)
+        label = match.group(1) if match else html
+
+    href_start = html.find('href="') + 6
+    href_end = html.find('"', href_start) if href_start >= 6 else -1
+    if href_end > href_start:
+        href = html[href_start:href_end]
+    else:
+        match = ANCHOR_HREF_PATTERN.search(html)
+        href = match.group(1) if match else html
+    return label, href
+
+# Numbers with thousands separators, such as '1,000.5', which tabulate also reads as numbers
+THOUSANDS_NUMBER_PATTERN = re.compile(r"^(([+-]?[0-9]{1,3})(?:,([0-9]{3}))*)?(?(1)\.[0-9]*|\.[0-9]+)?$")
+# Line breaks (every `str.splitlines` separator) and escapes that tabulate lays out differently
+TABULATE_CONTROL_PATTERN = re.compile(r"[\n\r\v\f\x1b\x1c\x1d\x1e]")
+
+def looks_numeric(value: str) -> bool:
+    """Whether `tabulate` would read the string as a number (or a boolean, which it ranks with numbers)."""
+    if value in ("True", "False"):
+        return True
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return "," in value and THOUSANDS_NUMBER_PATTERN.match(value) is not None
+
+def render_table(headers: list, rows: list, numeric: list, markdown: bool = False) -> str:
+    """
+    Render rows as a plain-text table identical to `tabulate(rows, headers=headers)`.
+
+    Column types are known up front, so there is no per-cell type sniffing: numeric
+    columns are right-aligned and all others left-aligned. Tables the fast path cannot
+    reproduce exactly (missing values, non-ASCII text or headers, line breaks of any kind,
+    unexpected types, or text columns that tabulate would read as numbers, thousands
+    separators included) fall back to `tabulate`.
+
+    Args:
+        headers (list): Column headers.
+        rows (list): Table rows, each a list of cell values.
+        numeric (list): Whether each column holds integers.
+        markdown (bool): Render a Markdown table instead. Defaults to False.
+
+    Returns:
+        str: The rendered table.
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(headers)
+    if markdown:
+        return render_markdown(headers, columns, numeric)
+    header_text = "".join(headers)
+    if not header_text.isascii() or TABULATE_CONTROL_PATTERN.search(header_text):
+        return tabulate(rows, headers=headers)
+    texts = []
+    aligns = []
+    for values, is_numeric in zip(columns, numeric):
+        if not values:
+            is_numeric = False
+        elif is_numeric:
+            if not all(type(value) is int for value in values):
+                return tabulate(rows, headers=headers)
+            values = list(map(str, values))
+        else:
+            if not all(type(value) is str for value in values):
+                return tabulate(rows, headers=headers)
+            # Checked before stripping, which would remove trailing line breaks
+            if TABULATE_CONTROL_PATTERN.search("".join(values)):
+                return tabulate(rows, headers=headers)
+            values = [value.strip() for value in values]
+            # tabulate skips empty cells when it guesses a column's type
+            if all(looks_numeric(value) for value in values if value):
+                return tabulate(rows, headers=headers)
+        text = "".join(values)
+        if not text.isascii():
+            return tabulate(rows, headers=headers)
+        texts.append(values)
+        aligns.append(str.rjust if is_numeric else str.ljust)
+
+    widths = [
+        max(len(header) + 2, max(map(len, values), default=0))
+        for header, values in zip(headers, texts)
+    ]
+    lines = [
+        "  ".join(align(header, width) for header, align, width in zip(headers, aligns, widths)).rstrip(),
+        "  ".join("-" * width for width in widths),
+    ]
+    padded = [[align(value, width) for value in values] for values, align, width in zip(texts, aligns, widths)]
+    lines.extend("  ".join(cells).rstrip() for cells in zip(*padded))
+    return "\n".join(lines)
+
+def render_markdown(headers: list, columns: list, numeric: list) -> str:
+    """Render columns of values as a Markdown table with right-aligned numeric columns."""
+    texts = [
+        ["" if value is None else str(value).replace("|", "\\|").replace("\n", " ") for value in values]
+        for values in columns
+    ]
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "| " + " | ".join("---:" if is_numeric else "---" for is_numeric in numeric) + " |",
+    ]
+    lines.extend("| " + " | ".join(cells) + " |" for cells in zip(*texts))
+    return "\n".join(lines)
+
+REQUIRED = object()
+
+class Column(NamedTuple):
+    """
+    One output column of a tool.
+
+    `kind` selects how the Dune field is rendered: 'raw' passes text through, 'int' passes
+    an integer through and right-aligns it, 'label' and 'link' take the text or href of an
+    HTML link, and 'usd' formats a number as dollars.
+    `field` may reference the tool's variant parameter, e.g. 'total_volume_{time_span}'.
+    `key` names the column in structured output and defaults to the snake-cased header.
+    """
+    header: str
+    field: str
+    kind: str = "raw"
+    default: Any = REQUIRED
+    key: str = None
+
+class ToolSpec(NamedTuple):
+    """
+    Declarative description of a Dune-backed tool.
+
+    `queries` maps each accepted value of `variant_param` to a Dune query ID; tools
+    without a variant parameter use the single key None.
+    `cursor` names the `(time, tx)` fields of time-ordered queries; such tools accept a
+    `since` cursor and then return only the rows newer than it. The tx may be a Column,
+    whose typed value (e.g. the mint inside a link) then keys the row.
+    Rows of tools with a column keyed 'mint_address' are indexed for `lookup_token`.
+    """
+    name: str
+    description: str
+    title: str
+    columns: tuple
+    queries: dict
+    variant_param: str = None
+    default_variant: str = None
+    invalid_variant: str = None
+    ttl: int = None
+    cursor: tuple = None
+
+def column_key(column: Column) -> str:
+    return column.key or re.sub(r"[^a-z0-9]+", "_", column.header.lower()).strip("_")
+
+def compile_column(column: Column, variant_values: dict, typed: bool = False) -> Callable:
+    """
+    Build the function that extracts and renders one column from a Dune row.
+
+    With `typed`, numbers are passed through as-is instead of being formatted as text.
+    """
+    field = column.field.format(**variant_values)
+    default = column.default
+    if default is REQUIRED:
+        get = lambda row: row[field]
+    else:
+        get = lambda row: row.get(field, default)
+    if column.kind == "label":
+        return lambda row: parse_anchor(get(row))[0]
+    if column.kind == "link":
+        return lambda row: parse_anchor(get(row))[1]
+    if column.kind == "usd" and not typed:
+        return lambda row: f"${get(row):.2f}"
+    return get
+
+def compile_cursor(cursor: tuple) -> tuple:
+    """Resolve a ToolSpec cursor to the `(time_field, tx_field)` a RecentRows takes."""
+    time_field, tx = cursor
+    if not isinstance(tx, Column):
+        return time_field, tx
+    extract = compile_column(tx, {}, typed=True)
+    # Rows missing the field fall back to RecentRows' row fingerprint
+    return time_field, lambda row: extract(row) if row.get(tx.field) else None
+
+def compile_projection(columns: tuple, variant_values: dict, typed: bool = False) -> Callable:
+    """Build the function that turns a Dune row into a table row (or a row of typed values)."""
+    extractors = tuple(compile_column(column, variant_values, typed) for column in columns)
+    return lambda row: [extract(row) for extract in extractors]
+
+def render_structured(keys: list, rows: list, output_format: str) -> str:
+    """
+    Serialize rows of typed values as JSON.
+
+    Args:
+        keys (list): Column keys.
+        rows (iterable): Rows of typed values, in column order, consumed lazily.
+        output_format (str): 'json' for an array of objects, 'ndjson' for one object per
+            line, or 'columns' for an object mapping each key to its column of values.
+
+    Returns:
+        str: The serialized rows.
+    """
+    if output_format == "columns":
+        columns = list(zip(*rows)) or [()] * len(keys)
+        return json.dumps(dict(zip(keys, map(list, columns))), separators=(",", ":"))
+    records = (dict(zip(keys, row)) for row in rows)
+    if output_format == "ndjson":
+        return "\n".join(json.dumps(record, separators=(",", ":")) for record in records)
+    return json.dumps(list(records), separators=(",", ":"))
+
+# Registered tool specs by name
+TOOL_SPECS = {}
+
+OUTPUT_FORMATS = ("table", "markdown", "json", "ndjson", "columns")
+OUTPUT_FORMAT_ARG = """
+    output_format (str): 'table' for a plain-text table, 'markdown' for a Markdown table,
+        or typed values as 'json' (array of objects), 'ndjson' (one object per line) or
+        'columns' (object of column arrays). Defaults to 'table'."""
+SINCE_ARG = """
+    since (str): Return only rows newer than this cursor, oldest `limit` first. Each row's
+        cursor is in the 'cursor' field of structured output, and tables end with the next
+        cursor to pass, with or without `since`. A bare time such as '2025-06-14 10:00:00'
+        skips every row at that time. Use '0' to start from the oldest buffered row.
+        Defaults to '' (off)."""
+
+def register_tool(spec: ToolSpec):
+    """
+    Compile a ToolSpec and register it as an MCP tool.
+
+    Row projections are compiled once per variant here, and every generated tool shares
+    the same fetch, cache and render path.
+
+    Args:
+        spec (ToolSpec): The tool to register.
+
+    Returns:
+        Callable: The generated async tool function.
+    """
+    projections = {}
+    typed_projections = {}
+    for variant in spec.queries:
+        variant_values = {spec.variant_param: variant} if spec.variant_param else {}
+        projections[variant] = compile_projection(spec.columns, variant_values)
+        typed_projections[variant] = compile_projection(spec.columns, variant_values, typed=True)
+    headers = [column.header for column in spec.columns]
+    keys = [column_key(column) for column in spec.columns]
+    numeric = [column.kind == "int" for column in spec.columns]
+    parameters = [
+        inspect.Parameter("limit", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=100, annotation=int),
+        inspect.Parameter("output_format", inspect.Parameter.POSITIONAL_OR_KEYWORD, default="table", annotation=str),
+    ]
+    if spec.variant_param:
+        parameters.insert(0, inspect.Parameter(
+            spec.variant_param, inspect.Parameter.POSITIONAL_OR_KEYWORD, default=spec.default_variant, annotation=str
+        ))
+    if spec.cursor:
+        parameters.append(inspect.Parameter("since", inspect.Parameter.POSITIONAL_OR_KEYWORD, default="", annotation=str))
+    signature = inspect.Signature(parameters, return_annotation=str)
+
+    async def tool(*args, **kwargs) -> str:
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        limit = arguments.arguments["limit"]
+        variant = arguments.arguments.get(spec.variant_param)
+        output_format = arguments.arguments["output_format"]
+        try:
+            query_id = spec.queries.get(variant)
+            if query_id is None:
+                raise ValueError(spec.invalid_variant)
+            if output_format not in OUTPUT_FORMATS:
+                raise ValueError(f"Invalid output_format value. Allowed: {' | '.join(OUTPUT_FORMATS)}")
+            since = arguments.arguments.get("since")
+            if since:
+                return await render_since(query_id, variant, since, limit, output_format, arguments.arguments)
+            data = await get_latest_result(query_id, limit=limit)
+            buffer = ROW_BUFFERS.get(query_id)
+            if output_format not in ("table", "markdown"):
+                project = typed_projections[variant]
+                if buffer is None:
+                    return render_structured(keys, map(project, data), output_format)
+                rows = (project(row) + [format_cursor(buffer.cursor(row))] for row in data)
+                return render_structured(keys + ["cursor"], rows, output_format)
+            project = projections[variant]
+            rows = [project(row) for row in data]
+            table = render_table(headers, rows, numeric, markdown=output_format == "markdown")
+            if buffer is not None:
+                table += f"\n\nNext cursor: {buffer.newest_cursor()}"
+            return spec.title.format(**arguments.arguments) + "\n\n" + table
+        except Exception as e:
+            return str(e)
+
+    async def render_since(query_id, variant, since, limit, output_format, values) -> str:
+        items = await get_rows_since(query_id, since, limit)
+        if output_format not in ("table", "markdown"):
+            project = typed_projections[variant]
+            rows = (project(row) + [format_cursor(cursor)] for cursor, row in items)
+            return render_structured(keys + ["cursor"], rows, output_format)
+        project = projections[variant]
+        table = render_table(headers, [project(row) for _, row in items], numeric, markdown=output_format == "markdown")
+        next_cursor = format_cursor(items[0][0]) if items else since
+        return spec.title.format(**values) + "\n\n" + table + f"\n\nNext cursor: {next_cursor}"
+
+    tool.__name__ = tool.__qualname__ = spec.name
+    arg_docs = OUTPUT_FORMAT_ARG + (SINCE_ARG if spec.cursor else "")
+    tool.__doc__ = inspect.cleandoc(spec.description).replace("\n\nReturns:", arg_docs + "\n\nReturns:", 1)
+    tool.__signature__ = signature
+    for variant, query_id in spec.queries.items():
+        RADAR_QUERIES[query_id] = f"{spec.name}/{variant}" if spec.variant_param else spec.name
+        if spec.ttl is not None:
+            QUERY_TTLS[query_id] = spec.ttl
+        if spec.cursor:
+            ROW_BUFFERS[query_id] = RecentRows(*compile_cursor(spec.cursor), RADAR_CURSOR_BUFFER_ROWS)
+        mint_columns = [column for column in spec.columns if column_key(column) == "mint_address"]
+        if mint_columns:
+            variant_values = {spec.variant_param: variant} if spec.variant_param else {}
+            token_index.add_source(query_id, IndexedSource(
+                RADAR_QUERIES[query_id],
+                compile_column(mint_columns[0], variant_values, typed=True),
+                headers,
+                keys,
+                numeric,
+                projections[variant],
+                typed_projections[variant],
+            ))
+    TOOL_SPECS[spec.name] = spec
+    mcp.add_tool(tool)
+    return tool
+
+get_trending_tokens_by_source = register_tool(ToolSpec(
+    name="get_trending_tokens_by_source",
+    description="""Retrieve top traded tokens on specified source platform in the last 12 hours.
 
     Args:
         source (str): The platform to query tokens from. Must be one of: 'Telegram', 'Web', 'Mobile'.
@@ -68,35 +1072,24 @@ def get_trending_tokens_by_source(source: str = "Telegram", limit: int = 100) ->
     Raises:
         ValueError: If an invalid source value is provided.
         httpx.HTTPStatusError: If the Dune API request fails.
-    """
-    query_ids = {
-        "Telegram": 4830187,
-        "Web": 4830192,
-        "Mobile": 4930328,
-    }    
-    try:
-        query_id = query_ids.get(source)
-        if query_id is None:
-            raise ValueError("Invalid source value. Allowed: Telegram | Web | Mobile")
-        data = get_latest_result(query_id, limit=limit)
-        rows = [
-            [ 
-                row["rank"], 
-                strip_a_tag(row["token_link"]), 
-                row["token_mint_address"], 
-                f'${row["total_volume_usd"]:.2f}', 
-                row["total_trades"] 
-            ]
-            for row in data
-        ]
-        headers = ["Rank", "Token", "Mint Address", "Volume(12h)", "Total Trades"]    
-        return f"# Top {limit} Trending Tokens on {source} - Last 12 Hours\n\n" + tabulate(rows, headers=headers)
-    except Exception as e:
-        return str(e)
+    """,
+    title="# Top {limit} Trending Tokens on {source} - Last 12 Hours",
+    columns=(
+        Column("Rank", "rank", "int"),
+        Column("Token", "token_link", "label"),
+        Column("Mint Address", "token_mint_address"),
+        Column("Volume(12h)", "total_volume_usd", "usd", key="volume_usd"),
+        Column("Total Trades", "total_trades", "int"),
+    ),
+    queries=TRENDING_BY_SOURCE_QUERY_IDS,
+    variant_param="source",
+    default_variant="Telegram",
+    invalid_variant="Invalid source value. Allowed: Telegram | Web | Mobile",
+))
 
-@mcp.tool()
-def get_pumpfun_graduates_by_marketcap(limit: int = 100) -> str:
-    """Retrieve Pump.fun token launches sorted by highest market capitalization in the last 24 hours.
+get_pumpfun_graduates_by_marketcap = register_tool(ToolSpec(
+    name="get_pumpfun_graduates_by_marketcap",
+    description="""Retrieve Pump.fun token launches sorted by highest market capitalization in the last 24 hours.
 
     Args:
         limit (int): Maximum number of tokens to return. Defaults to 100.
@@ -107,27 +1100,21 @@ def get_pumpfun_graduates_by_marketcap(limit: int = 100) -> str:
 
     Raises:
         httpx.HTTPStatusError: If the Dune API request fails.
-    """
-    try:
-        data = get_latest_result(4124453, limit=limit)
-        rows = [
-            [ 
-                row["rank"], 
-                strip_a_tag(row["asset_with_chart"]), 
-                row["token_address"], 
-                f'${row["market_cap"]:.2f}', 
-                row["trade_count"] 
-            ]
-            for row in data
-        ]
-        headers = ["Rank", "Token", "Mint Address", "MarketCap", "Trade Count"]
-        return f"# Top {limit} Pump.fun Graduates by MarketCap - Last 24 Hours\n\n" + tabulate(rows, headers=headers)
-    except Exception as e:
-        return str(e)
-    
-@mcp.tool()
-def get_pumpfun_graduates_by_trading_volume(limit: int = 100) -> str:    
-    """Retrieve Pump.fun token launches sorted by highest trading volume in the last 24 hours.
+    """,
+    title="# Top {limit} Pump.fun Graduates by MarketCap - Last 24 Hours",
+    columns=(
+        Column("Rank", "rank", "int"),
+        Column("Token", "asset_with_chart", "label"),
+        Column("Mint Address", "token_address"),
+        Column("MarketCap", "market_cap", "usd", key="market_cap"),
+        Column("Trade Count", "trade_count", "int"),
+    ),
+    queries={None: PUMPFUN_GRADUATES_BY_MARKETCAP_QUERY_ID},
+))
+
+get_pumpfun_graduates_by_trading_volume = register_tool(ToolSpec(
+    name="get_pumpfun_graduates_by_trading_volume",
+    description="""Retrieve Pump.fun token launches sorted by highest trading volume in the last 24 hours.
 
     Args:
         limit (int): Maximum number of tokens to return. Defaults to 100.
@@ -138,27 +1125,21 @@ def get_pumpfun_graduates_by_trading_volume(limit: int = 100) -> str:
 
     Raises:
         httpx.HTTPStatusError: If the Dune API request fails.
-    """
-    try:
-        data = get_latest_result(4832613, limit=limit)
-        rows = [
-            [ 
-                row["volume_rank"], 
-                strip_a_tag(row["asset_with_chart"]), 
-                strip_a_tag(row["token_address_with_chart"]), 
-                f'${row["total_volume"]:.2f}', 
-                row["graduation_time"] 
-            ]
-            for row in data
-        ]
-        headers = ["Rank", "Token", "Mint Address", "Volume(12h)", "Graduation Time"]
-        return f"# Top {limit} Pump.fun Graduates by Trading Volume - Last 24 Hours\n\n" + tabulate(rows, headers=headers)
-    except Exception as e:
-        return str(e)
-    
-@mcp.tool()
-def get_recent_pumpfun_graduates(limit: int = 100) -> str:
-    """Retrieve the most recently graduated tokens from Pump.fun in the last 24 hours.
+    """,
+    title="# Top {limit} Pump.fun Graduates by Trading Volume - Last 24 Hours",
+    columns=(
+        Column("Rank", "volume_rank", "int"),
+        Column("Token", "asset_with_chart", "label"),
+        Column("Mint Address", "token_address_with_chart", "label"),
+        Column("Volume(12h)", "total_volume", "usd", key="volume_usd"),
+        Column("Graduation Time", "graduation_time"),
+    ),
+    queries={None: PUMPFUN_GRADUATES_BY_VOLUME_QUERY_ID},
+))
+
+get_recent_pumpfun_graduates = register_tool(ToolSpec(
+    name="get_recent_pumpfun_graduates",
+    description="""Retrieve the most recently graduated tokens from Pump.fun in the last 24 hours.
 
     Args:
         limit (int): Maximum number of tokens to return. Defaults to 100.
@@ -170,27 +1151,23 @@ def get_recent_pumpfun_graduates(limit: int = 100) -> str:
 
     Raises:
         httpx.HTTPStatusError: If the Dune API request fails.
-    """
-    try:
-        data = get_latest_result(4832245, limit=limit)
-        rows = [
-            [ 
-                row["graduation_time"], 
-                strip_a_tag(row["asset_with_chart"]), 
-                strip_a_tag(row["token_address_with_chart"]), 
-                f'${row["market_cap"]:.2f}', 
-                row["trade_count"] 
-            ]
-            for row in data
-        ]
-        headers = ["Graduation Time", "Token", "Mint Address", "Market Cap", "Trade Count"]
-        return f"# Recent {limit} Pump.fun Graduates - Last 24 Hours\n\n" + tabulate(rows, headers=headers)
-    except Exception as e:
-        return str(e)
-    
-@mcp.tool()
-def get_recent_kol_buys(limit: int = 100) -> str:
-    """Retrieve recent token purchases by memecoin Key Opinion Leaders (KOLs).
+    """,
+    title="# Recent {limit} Pump.fun Graduates - Last 24 Hours",
+    columns=(
+        Column("Graduation Time", "graduation_time"),
+        Column("Token", "asset_with_chart", "label"),
+        Column("Mint Address", "token_address_with_chart", "label"),
+        Column("Market Cap", "market_cap", "usd", key="market_cap"),
+        Column("Trade Count", "trade_count", "int"),
+    ),
+    queries={None: RECENT_PUMPFUN_GRADUATES_QUERY_ID},
+    ttl=120,
+    cursor=("graduation_time", Column("Mint Address", "token_address_with_chart", "label")),
+))
+
+get_recent_kol_buys = register_tool(ToolSpec(
+    name="get_recent_kol_buys",
+    description="""Retrieve recent token purchases by memecoin Key Opinion Leaders (KOLs).
 
     Args:
         limit (int): Maximum number of buy transactions to return. Defaults to 100.
@@ -201,27 +1178,23 @@ def get_recent_kol_buys(limit: int = 100) -> str:
 
     Raises:
         httpx.HTTPStatusError: If the Dune API request fails.
-    """
-    try:
-        data = get_latest_result(4832844, limit=limit)
-        rows = [
-            [
-                row["buy_time"],
-                a_tag_link(row["kol_with_link"]),
-                strip_a_tag(row["token_with_chart"]),
-                strip_a_tag(row["contract_with_chart"]),
-                f'${row["amount_usd"]:.2f}'
-            ]
-            for row in data
-        ]
-        headers = ["Time", "KOL", "Token", "Mint Address", "Amount"]
-        return f"# Recent {limit} Buys by Memecoin KOLs\n\n" + tabulate(rows, headers=headers)
-    except Exception as e:
-        return str(e)
-    
-@mcp.tool()
-def get_trending_tokens_by_kol_trading_volume(limit: int = 100) -> str:
-    """Retrieve tokens with the highest trading volume by memecoin KOLs.
+    """,
+    title="# Recent {limit} Buys by Memecoin KOLs",
+    columns=(
+        Column("Time", "buy_time"),
+        Column("KOL", "kol_with_link", "link", key="kol_url"),
+        Column("Token", "token_with_chart", "label"),
+        Column("Mint Address", "contract_with_chart", "label"),
+        Column("Amount", "amount_usd", "usd", key="amount_usd"),
+    ),
+    queries={None: RECENT_KOL_BUYS_QUERY_ID},
+    ttl=60,
+    cursor=("buy_time", "tx_hash"),
+))
+
+get_trending_tokens_by_kol_trading_volume = register_tool(ToolSpec(
+    name="get_trending_tokens_by_kol_trading_volume",
+    description="""Retrieve tokens with the highest trading volume by memecoin KOLs.
 
     Args:
         limit (int): Maximum number of tokens to return. Defaults to 100.
@@ -233,27 +1206,21 @@ def get_trending_tokens_by_kol_trading_volume(limit: int = 100) -> str:
 
     Raises:
         httpx.HTTPStatusError: If the Dune API request fails.
-    """
-    try:
-        data = get_latest_result(4838351, limit=limit)
-        rows = [
-            [
-                row["token"],
-                row["contract_address"],
-                row["unique_kols"],
-                row["total_buys"],
-                f'${row["total_volume"]:.2f}'
-            ]
-            for row in data
-        ]
-        headers = ["Token", "Mint Address", "Unique KOL Buys", "Total Buys", "Total Volume"]
-        return f"# Top {limit} Trending Tokens by KOL Trading Volume\n\n" + tabulate(rows, headers=headers)
-    except Exception as e:
-        return str(e)
-    
-@mcp.tool()
-def get_trending_tokens_on_raydium(time_span: str = "5h", limit: int = 100) -> str:
-    """Retrieve tokens with the highest trading volume on Raydium within a specified time span.
+    """,
+    title="# Top {limit} Trending Tokens by KOL Trading Volume",
+    columns=(
+        Column("Token", "token"),
+        Column("Mint Address", "contract_address"),
+        Column("Unique KOL Buys", "unique_kols", "int"),
+        Column("Total Buys", "total_buys", "int"),
+        Column("Total Volume", "total_volume", "usd", key="volume_usd"),
+    ),
+    queries={None: KOL_TRADING_VOLUME_QUERY_ID},
+))
+
+get_trending_tokens_on_raydium = register_tool(ToolSpec(
+    name="get_trending_tokens_on_raydium",
+    description="""Retrieve tokens with the highest trading volume on Raydium within a specified time span.
 
     Args:
         time_span (str): Time period for the query. Must be one of: '5h', '12h', '24h'.
@@ -267,69 +1234,299 @@ def get_trending_tokens_on_raydium(time_span: str = "5h", limit: int = 100) -> s
     Raises:
         ValueError: If an invalid time_span value is provided.
         httpx.HTTPStatusError: If the Dune API request fails.
+    """,
+    title="# Top {limit} Trending Tokens on Raydium - Last {time_span}",
+    columns=(
+        Column("Token", "asset_with_chart", "label"),
+        Column("Mint Address", "token_address"),
+        Column("Volume", "total_volume_{time_span}", "usd", default=0, key="volume_usd"),
+    ),
+    queries=RAYDIUM_QUERY_IDS,
+    variant_param="time_span",
+    default_variant="5h",
+    invalid_variant="Invalid time_span value. Allowed: 5h | 12h | 24h",
+))
+
+get_trending_tokens_on_pumpswap = register_tool(ToolSpec(
+    name="get_trending_tokens_on_pumpswap",
+    description="""Retrieve tokens with the highest trading volume on PumpSwap within a specified time span.
+
+    Args:
+        time_span (str): Time period for the query. Must be one of: '5h', '12h', '24h'.
+            Defaults to '5h'.
+        limit (int): Maximum number of tokens to return. Defaults to 100.
+
+    Returns:
+        str: A formatted table of trending tokens on PumpSwap including mint address
+            and trading volume, or an error message if the query fails.
+
+    Raises:
+        ValueError: If an invalid time_span value is provided.
+        httpx.HTTPStatusError: If the Dune API request fails.
+    """,
+    title="# Top {limit} Trending Tokens on PumpSwap - Last {time_span}",
+    columns=(
+        Column("Mint Address", "contract_address", "label"),
+        Column("Trading Volume", "volume_usd", "usd", key="volume_usd"),
+    ),
+    queries=PUMPSWAP_QUERY_IDS,
+    variant_param="time_span",
+    default_variant="5h",
+    invalid_variant="Invalid time_span value. Allowed: 5h | 12h | 24h",
+))
+
+@mcp.tool()
+async def lookup_token(mint: str, output_format: str = "table") -> str:
+    """Retrieve everything the radar datasets currently hold about one token.
+
+    Every dataset's latest rows are indexed by mint address as they are fetched, so the
+    lookup itself does not scan any results.
+
+    Args:
+        mint (str): The token's mint address.
+        output_format (str): 'table' for one plain-text table per dataset, 'markdown' for
+            Markdown tables, or 'json' for an object mapping each dataset to its rows as
+            typed values, with the datasets that could not be read under 'unavailable'.
+            Defaults to 'table'.
+
+    Returns:
+        str: The token's rows from every dataset it appears in, such as its trending rank,
+            volume, market capitalization, KOL buys and graduation time, followed by the
+            datasets that could not be read, or an error message if none could be read.
+
+    Raises:
+        ValueError: If an invalid output_format value is provided.
+        httpx.HTTPStatusError: If the Dune API request fails.
     """
-    query_ids = {
-        "5h": 4840714,
-        "12h": 4840651, 
-        "24h": 4840709,
-    }
     try:
-        query_id = query_ids.get(time_span)
-        if query_id is None:
-            raise ValueError("Invalid time_span value. Allowed: 5h | 12h | 24h")
-        data = get_latest_result(query_id, limit=limit)
-        rows = [
-            [
-                strip_a_tag(row["asset_with_chart"]),
-                row["token_address"],
-                f'${row.get(f"total_volume_{time_span}", 0):.2f}'
-            ]
-            for row in data
+        if output_format not in LOOKUP_OUTPUT_FORMATS:
+            raise ValueError(f"Invalid output_format value. Allowed: {' | '.join(LOOKUP_OUTPUT_FORMATS)}")
+        mint = mint.strip()
+        query_ids = list(token_index.sources)
+        # Cache hits while the refresher runs; otherwise this fetches the missing datasets
+        results = await asyncio.gather(
+            *(get_latest_result(query_id, limit=RADAR_FETCH_ROWS or 1000) for query_id in query_ids),
+            return_exceptions=True,
+        )
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if failures and len(failures) == len(results):
+            raise failures[0]
+        unavailable = [
+            token_index.sources[query_id].dataset
+            for query_id, rows in zip(query_ids, results) if isinstance(rows, BaseException)
+        ]
+        found = token_index.lookup(mint)
+        sources = [
+            (source, found[query_id]) for query_id, source in token_index.sources.items()
+            if query_id in found and source.dataset not in unavailable
         ]
-        headers = ["Token", "Mint Address", "Volume"]
-        return f"# Top {limit} Trending Tokens on Raydium - Last {time_span}\n\n" + tabulate(rows, headers=headers) 
+
+        if output_format == "json":
+            return json.dumps({
+                "mint": mint,
+                "datasets": {
+                    source.dataset: [dict(zip(source.keys, source.typed_project(row))) for row in rows]
+                    for source, rows in sources
+                },
+                "unavailable": unavailable,
+            }, separators=(",", ":"))
+        note = f"\n\nNot checked, could not be read: {', '.join(unavailable)}" if unavailable else ""
+        if not sources:
+            return f"Token {mint} was not found in any dataset" + note
+        sections = [f"# Token {mint} - Found in {len(sources)} Datasets"]
+        for source, rows in sources:
+            table = render_table(
+                source.headers, [source.project(row) for row in rows], source.numeric,
+                markdown=output_format == "markdown",
+            )
+            sections.append(f"## {source.dataset}\n\n{table}")
+        return "\n\n".join(sections) + note
     except Exception as e:
         return str(e)
-    
+
 @mcp.tool()
-def get_trending_tokens_on_pumpswap(time_span: str = "5h", limit: int = 100) -> str:
-    """Retrieve tokens with the highest trading volume on PumpSwap within a specified time span.
+async def get_trending_tokens_combined(time_span: str = "12h", limit: int = 100, output_format: str = "table") -> str:
+    """Retrieve the top traded tokens across Telegram, Web, Mobile, Raydium and PumpSwap.
+
+    All five datasets are fetched concurrently and merged by mint address. Each token is
+    ranked by its volume summed over the sources it appears in, counting each source once.
+    Sources that could not be read are left out and listed as missing.
 
     Args:
-        time_span (str): Time period for the query. Must be one of: '5h', '12h', '24h'.
-            Defaults to '5h'.
+        time_span (str): Time period of the Raydium and PumpSwap volumes. Must be one of:
+            '5h', '12h', '24h'. Telegram, Web and Mobile always cover 12 hours. Defaults to '12h'.
         limit (int): Maximum number of tokens to return. Defaults to 100.
+        output_format (str): 'table' for a plain-text table, 'markdown' for a Markdown table,
+            or typed values as 'json' (array of objects), 'ndjson' (one object per line) or
+            'columns' (object of column arrays). Defaults to 'table'.
 
     Returns:
-        str: A formatted table of trending tokens on PumpSwap including mint address
-            and trading volume, or an error message if the query fails.
+        str: A formatted table of tokens including rank, token name, mint address, combined
+            volume and the volume from each source, followed by the sources that could not
+            be read (a 'missing_sources' field in structured output), or an error message if
+            none could be read.
 
     Raises:
-        ValueError: If an invalid time_span value is provided.
+        ValueError: If an invalid time_span or output_format value is provided.
         httpx.HTTPStatusError: If the Dune API request fails.
     """
-    query_ids = {
-        "5h": 4929624,
-        "12h": 4929617,
-        "24h": 4929607,
-    }
     try:
-        query_id = query_ids.get(time_span)
-        if query_id is None:
+        if time_span not in RAYDIUM_QUERY_IDS:
             raise ValueError("Invalid time_span value. Allowed: 5h | 12h | 24h")
-        data = get_latest_result(query_id, limit=limit)
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Invalid output_format value. Allowed: {' | '.join(OUTPUT_FORMATS)}")
+        sources = {
+            **TRENDING_BY_SOURCE_QUERY_IDS,
+            "Raydium": RAYDIUM_QUERY_IDS[time_span],
+            "PumpSwap": PUMPSWAP_QUERY_IDS[time_span],
+        }
+        results = await asyncio.gather(
+            *(get_latest_result(query_id, limit=RADAR_FETCH_ROWS or 1000) for query_id in sources.values()),
+            return_exceptions=True,
+        )
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if failures and len(failures) == len(results):
+            raise failures[0]
+        missing = [name for name, rows in zip(sources, results) if isinstance(rows, BaseException)]
+
+        tokens = {}  # mint -> [total volume, token name, {source: volume}]
+        for (name, query_id), rows in zip(sources.items(), results):
+            if name in missing:
+                continue
+            source = token_index.sources[query_id]
+            volume_at = source.keys.index("volume_usd")
+            token_at = source.keys.index("token") if "token" in source.keys else None
+            for row in rows:
+                try:
+                    mint = source.mint(row)
+                except (KeyError, TypeError, AttributeError):
+                    continue
+                if not mint:
+                    continue
+                values = source.typed_project(row)
+                token = tokens.setdefault(mint, [0.0, None, {}])
+                if name in token[2]:
+                    continue
+                volume = values[volume_at] or 0
+                token[0] += volume
+                token[2][name] = volume
+                if token[1] is None and token_at is not None:
+                    token[1] = values[token_at]
+        by_volume = lambda item: item[1][0]
+        if limit > 0:
+            top = heapq.nlargest(limit, tokens.items(), key=by_volume)
+        else:
+            top = sorted(tokens.items(), key=by_volume, reverse=True)
+
+        if output_format not in ("table", "markdown"):
+            keys = ["rank", "token", "mint_address", "volume_usd", "sources", "missing_sources"]
+            rows = (
+                [rank, token, mint, volume, by_source, missing]
+                for rank, (mint, (volume, token, by_source)) in enumerate(top, 1)
+            )
+            return render_structured(keys, rows, output_format)
+        read = [name for name in sources if name not in missing]
+        headers = ["Rank", "Token", "Mint Address", "Total Volume", *read]
+        numeric = [True] + [False] * (len(headers) - 1)
         rows = [
-            [
-                strip_a_tag(row["contract_address"]),
-                f'${row["volume_usd"]:.2f}'
-            ]
-            for row in data
+            [rank, token or "", mint, f"${volume:.2f}"]
+            + [f"${by_source[name]:.2f}" if name in by_source else "-" for name in read]
+            for rank, (mint, (volume, token, by_source)) in enumerate(top, 1)
         ]
-        headers = ["Mint Address", "Trading Volume"]
-        return f"# Top {limit} Trending Tokens on PumpSwap - Last {time_span}\n\n" + tabulate(rows, headers=headers)
+        table = render_table(headers, rows, numeric, markdown=output_format == "markdown")
+        if missing:
+            table += f"\n\nMissing sources, could not be read: {', '.join(missing)}"
+        return f"# Top {limit} Trending Tokens Across All Sources - Raydium & PumpSwap Last {time_span}\n\n" + table
     except Exception as e:
-        return str(e)  
-    
+        return str(e)
+
+def register_feed(uri: str, spec: ToolSpec, description: str):
+    """
+    Expose a cursor-enabled tool's newest rows as a subscribable MCP resource.
+
+    Reading the resource returns the newest RADAR_FEED_ROWS rows as typed values, each
+    with its cursor. Subscribers are notified whenever a refresh merges new rows, after
+    which they read the resource again or call the tool with `since`.
+
+    Args:
+        uri (str): The resource URI.
+        spec (ToolSpec): A registered tool with a `cursor` and no variant parameter.
+        description (str): The resource description.
+    """
+    query_id = spec.queries[None]
+    project = compile_projection(spec.columns, {}, typed=True)
+    keys = [column_key(column) for column in spec.columns]
+
+    async def read_feed() -> str:
+        buffer = await get_row_buffer(query_id)
+        items = buffer.latest(RADAR_FEED_ROWS)
+        return json.dumps({
+            "cursor": format_cursor(items[0][0]) if items else None,
+            "rows": [{**dict(zip(keys, project(row))), "cursor": format_cursor(cursor)} for cursor, row in items],
+        }, separators=(",", ":"))
+
+    read_feed.__name__ = spec.name + "_feed"
+    FEEDS[query_id] = uri
+    mcp.resource(uri, description=description, mime_type="application/json")(read_feed)
+
+register_feed(
+    "radar://feed/kol-buys",
+    TOOL_SPECS["get_recent_kol_buys"],
+    "Newest KOL buys with their cursors; subscribe to be notified as new buys arrive.",
+)
+register_feed(
+    "radar://feed/pumpfun-graduates",
+    TOOL_SPECS["get_recent_pumpfun_graduates"],
+    "Newest Pump.fun graduates with their cursors; subscribe to be notified as new graduates arrive.",
+)
+
+@mcp._mcp_server.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    if str(uri) not in FEEDS.values():
+        raise ValueError(f"Resource {uri} does not support subscriptions")
+    feed_hub.subscribe(str(uri), mcp._mcp_server.request_context.session)
+
+@mcp._mcp_server.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    feed_hub.unsubscribe(str(uri), mcp._mcp_server.request_context.session)
+
+_get_capabilities = mcp._mcp_server.get_capabilities
+
+def get_capabilities(*args, **kwargs):
+    # The low-level server never advertises resource subscriptions on its own
+    capabilities = _get_capabilities(*args, **kwargs)
+    if capabilities.resources is not None:
+        capabilities.resources.subscribe = True
+    return capabilities
+
+mcp._mcp_server.get_capabilities = get_capabilities
+
+@mcp.resource("radar://cache/stats", mime_type="application/json")
+def get_cache_stats() -> str:
+    """Hit, miss, coalesced, expiry and eviction counters for the Dune result cache."""
+    return json.dumps(result_cache.stats())
+
+@mcp.resource("radar://health", mime_type="application/json")
+def get_health() -> str:
+    """Age, expiry and last refresh outcome of every cached Dune dataset."""
+    now = time.time()
+    datasets = []
+    for query_id, name in RADAR_QUERIES.items():
+        entry = result_cache.peek((query_id, RADAR_FETCH_ROWS))
+        status = refresh_status.get(query_id, {})
+        datasets.append({
+            "dataset": name,
+            "query_id": query_id,
+            "rows": len(entry.rows) if entry else 0,
+            "age_seconds": round(now - entry.fetched_at, 1) if entry else None,
+            "upstream_age_seconds": round(now - entry.execution_ended_at, 1) if entry and entry.execution_ended_at else None,
+            "stale": entry.expires_at <= now if entry else None,
+            "refreshes": status.get("refreshes", 0),
+            "failures": status.get("failures", 0),
+            "last_error": status.get("last_error"),
+        })
+    return json.dumps({"refresher": RADAR_REFRESH, "feeds": feed_hub.stats(), "indexed_tokens": len(token_index), "datasets": datasets})
+
 # Run the server
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
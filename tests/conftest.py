@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Keep imports of main.py away from the real snapshot file and the background refresher
+os.environ["DUNE_API_KEY"] = "test"
+os.environ["RADAR_SNAPSHOT_PATH"] = ""
+os.environ["RADAR_REFRESH"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
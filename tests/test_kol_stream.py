@@ -0,0 +1,81 @@
+import asyncio
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import combined_server
+from dune_rows import RecentRows, format_cursor
+
+
+def buy(i: int) -> dict:
+    return {"transaction_time": f"2025-06-14 10:00:{i:02d}", "tx_hash": f"tx{i:02d}",
+            "kol_name": "kol", "token_symbol": "TOK", "token_address": "Mint", "usd_amount": 1.0}
+
+
+def cursor(i: int) -> str:
+    return format_cursor((f"2025-06-14 10:00:{i:02d}", f"tx{i:02d}"))
+
+
+def fake_stream(monkeypatch, upstream: list, poll_interval: float) -> RecentRows:
+    """A fresh buffer and stream whose Dune fetches return `upstream` (which tests may grow)"""
+    buffer = RecentRows("transaction_time", "tx_hash", 100)
+    monkeypatch.setattr(combined_server, "recent_kol_buys", buffer)
+    monkeypatch.setattr(combined_server, "kol_buy_stream", combined_server.KolBuyStream(buffer))
+    monkeypatch.setattr(combined_server, "DUNE_API_KEY", "key")
+    monkeypatch.setattr(combined_server, "STREAM_POLL_INTERVAL", poll_interval)
+
+    async def get_dune_memecoin_data(method, params, max_age=None):
+        buffer.merge(list(upstream))
+
+    monkeypatch.setattr(combined_server, "get_dune_memecoin_data", get_dune_memecoin_data)
+    return buffer
+
+
+async def read_ids(client, ids: list, **headers):
+    response = await client.get("/stream/kol-buys", headers=headers)
+    async for line in response.content:
+        if line.startswith(b"id: "):
+            ids.append(line[4:].strip().decode())
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_resume_after_restart_replays_every_buy_after_the_cursor(monkeypatch):
+    fake_stream(monkeypatch, [buy(i) for i in range(20)], poll_interval=60)
+
+    async def scenario():
+        ids = []
+        async with TestClient(TestServer(combined_server.create_app())) as client:
+            reader = asyncio.ensure_future(read_ids(client, ids, **{"Last-Event-ID": cursor(9)}))
+            await wait_for(lambda: len(ids) >= 10)
+            reader.cancel()
+        return ids
+
+    assert asyncio.run(scenario()) == [cursor(i) for i in range(10, 20)]
+
+
+def test_resumed_client_gets_buys_merged_between_polls_once(monkeypatch):
+    upstream = [buy(i) for i in range(10)]
+    buffer = fake_stream(monkeypatch, upstream, poll_interval=0.2)
+
+    async def scenario():
+        watching, resumed = [], []
+        async with TestClient(TestServer(combined_server.create_app())) as client:
+            readers = [asyncio.ensure_future(read_ids(client, watching))]
+            await wait_for(lambda: combined_server.kol_buy_stream.stats()["clients"] == 1)
+            await asyncio.sleep(0.05)  # The poller has taken buy 9 as its cursor
+            upstream.extend(buy(i) for i in range(10, 15))
+            buffer.merge(list(upstream))  # An RPC call between two polls
+            readers.append(asyncio.ensure_future(read_ids(client, resumed, **{"Last-Event-ID": cursor(9)})))
+            await wait_for(lambda: len(watching) >= 5)
+            await asyncio.sleep(0.1)
+            for reader in readers:
+                reader.cancel()
+        return watching, resumed
+
+    watching, resumed = asyncio.run(scenario())
+    assert watching == resumed == [cursor(i) for i in range(10, 15)]
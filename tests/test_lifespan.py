@@ -0,0 +1,29 @@
+import asyncio
+
+import main
+
+
+def test_sessions_share_one_refresher_and_client(monkeypatch):
+    started = []
+
+    def start_refresher():
+        tasks = [asyncio.ensure_future(asyncio.sleep(3600))]
+        started.append(tasks)
+        return tasks
+
+    monkeypatch.setattr(main, "RADAR_REFRESH", True)
+    monkeypatch.setattr(main, "start_refresher", start_refresher)
+
+    async def scenario():
+        client = main.get_client()
+        first, second = main.lifespan(main.mcp), main.lifespan(main.mcp)
+        await first.__aenter__()
+        await second.__aenter__()
+        assert len(started) == 1
+        await first.__aexit__(None, None, None)
+        assert not started[0][0].cancelled() and not client.is_closed
+        await second.__aexit__(None, None, None)
+        assert started[0][0].cancelled() and client.is_closed
+
+    asyncio.run(scenario())
+    assert main._sessions == 0
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from combined_server import CoinGeckoAPI
+
+
+def markets_client(fail_pages=(), fail_times=1, total=2000):
+    client = CoinGeckoAPI()
+    requests = []
+    failures = {page: fail_times for page in fail_pages}
+
+    async def make_request(endpoint, params=None):
+        page, per_page = params["page"], params["per_page"]
+        requests.append(page)
+        if failures.get(page):
+            failures[page] -= 1
+            return None
+        first = (page - 1) * per_page
+        return [{"id": f"coin{i}", "market_cap_rank": i + 1} for i in range(first, min(first + per_page, total))]
+
+    client._make_request = make_request
+    return client, requests
+
+
+def test_pages_are_merged_in_rank_order():
+    client, requests = markets_client()
+    coins = asyncio.run(client.get_top_coins_markets("usd", 600))
+    assert [coin["market_cap_rank"] for coin in coins] == list(range(1, 601))
+    assert sorted(requests) == [1, 2, 3]
+
+
+def test_short_page_ends_the_list():
+    client, _ = markets_client(total=300)
+    coins = asyncio.run(client.get_top_coins_markets("usd", 1000))
+    assert len(coins) == 300
+
+
+def test_failed_page_is_retried():
+    client, requests = markets_client(fail_pages=[2])
+    coins = asyncio.run(client.get_top_coins_markets("usd", 750))
+    assert len(coins) == 750
+    assert requests.count(2) == 2
+
+
+def test_page_that_keeps_failing_raises_instead_of_truncating():
+    client, _ = markets_client(fail_pages=[3], fail_times=2)
+    with pytest.raises(RuntimeError, match="page 3 failed; got 500 of 2000 coins"):
+        asyncio.run(client.get_top_coins_markets("usd", 2000))
+
+
+def test_mock_data_only_when_every_page_fails():
+    client, _ = markets_client(fail_pages=[1, 2], fail_times=2)
+    coins = asyncio.run(client.get_top_coins_markets("usd", 500))
+    assert [coin["id"] for coin in coins] == ["bitcoin", "ethereum"]
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import combined_server
+from combined_server import CircuitBreaker, RecentResults
+
+
+def test_recent_results_expire_by_age(monkeypatch):
+    results = RecentResults(max_age=10, max_entries=4)
+    results.put("a", 1)
+    assert results.get("a")[1] == 1
+    now = time.time()
+    monkeypatch.setattr(combined_server.time, "time", lambda: now + 11)
+    assert results.get("a") is None
+    assert len(results) == 0
+
+
+def test_recent_results_evict_the_least_recently_used():
+    results = RecentResults(max_age=60, max_entries=2)
+    results.put("a", 1)
+    results.put("b", 2)
+    results.get("a")
+    results.put("c", 3)
+    assert results.get("b") is None
+    assert results.get("a")[1] == 1 and results.get("c")[1] == 3
+
+
+def test_recent_results_honour_a_shorter_max_age_per_call(monkeypatch):
+    results = RecentResults(max_age=300, max_entries=4)
+    results.put("a", 1)
+    now = time.time()
+    monkeypatch.setattr(combined_server.time, "time", lambda: now + 40)
+    assert results.get("a", max_age=30) is None
+    assert results.get("a")[1] == 1
+
+
+def test_stream_poll_does_not_reuse_a_result_older_than_its_interval(monkeypatch):
+    dune = combined_server.DuneAPI()
+    dune.api_key = "key"
+    executions = []
+
+    async def run_execution(query_id, parameters, key):
+        executions.append(query_id)
+        return dune._store_result(key, {"result": {"rows": []}})
+
+    monkeypatch.setattr(dune, "_run_execution", run_execution)
+
+    async def scenario():
+        await dune.execute_query(1, {"limit": 1000})
+        stored_at = dune._results.get(combined_server.dune_result_key(1, {"limit": 1000}))[0]
+        monkeypatch.setattr(combined_server.time, "time", lambda: stored_at + 60)
+        await dune.execute_query(1, {"limit": 1000})
+        await dune.execute_query(1, {"limit": 1000}, max_age=30)
+
+    asyncio.run(scenario())
+    assert len(executions) == 2
+
+
+def test_memecoin_query_keeps_only_the_parameters_sent_upstream():
+    assert combined_server.memecoin_query("get_recent_kol_buys", {"limit": "10", "foo": 1}) == \
+        combined_server.memecoin_query("get_recent_kol_buys", {"limit": 10})
+    assert combined_server.memecoin_query("unknown_method", {}) is None
+
+
+def test_last_good_result_is_served_with_its_age(monkeypatch):
+    monkeypatch.setattr(combined_server, "DUNE_API_KEY", "key")
+    monkeypatch.setattr(combined_server, "last_good_memecoin_data", RecentResults(3600, 8))
+    answers = [[{"token": "REAL"}], None]
+
+    async def get_dune_memecoin_data(method, params):
+        return answers.pop(0)
+
+    monkeypatch.setattr(combined_server, "get_dune_memecoin_data", get_dune_memecoin_data)
+
+    async def scenario():
+        live = await combined_server.get_memecoin_data("get_recent_kol_buys", {"limit": 10})
+        stale = await combined_server.get_memecoin_data("get_recent_kol_buys", {"limit": "10", "extra": True})
+        return live, stale
+
+    live, stale = asyncio.run(scenario())
+    assert live == [{"token": "REAL"}]
+    assert stale[0]["token"] == "REAL" and "data_age_seconds" in stale[0]
+    assert len(combined_server.last_good_memecoin_data) == 1
+
+
+def test_distinct_client_params_do_not_grow_the_caches_past_their_cap(monkeypatch):
+    monkeypatch.setattr(combined_server, "DUNE_API_KEY", "key")
+    monkeypatch.setattr(combined_server, "last_good_memecoin_data", RecentResults(3600, 8))
+
+    async def get_dune_memecoin_data(method, params):
+        return [{"limit": params["limit"]}]
+
+    monkeypatch.setattr(combined_server, "get_dune_memecoin_data", get_dune_memecoin_data)
+
+    async def scenario():
+        for limit in range(100):
+            await combined_server.get_memecoin_data("get_recent_kol_buys", {"limit": limit})
+
+    asyncio.run(scenario())
+    assert len(combined_server.last_good_memecoin_data) == 8
+
+
+def test_circuit_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=60)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_circuit_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=0)
+    for _ in range(5):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
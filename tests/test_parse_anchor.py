@@ -0,0 +1,31 @@
+import re
+
+import pytest
+
+from main import parse_anchor
+
+
+def strip_a_tag(html):
+    match = re.search(r'>(.*?)</a>', html)
+    return match.group(1) if match else html
+
+
+def a_tag_link(html):
+    match = re.search(r'href="([^"]+)"', html)
+    return match.group(1) if match else html
+
+
+@pytest.mark.parametrize("html", [
+    '<a href="https://dexscreener.com/solana/Mint1">TOKEN</a>',
+    '<a target="_blank" href="https://x.com/kol">kol (@kol)</a>',
+    '<a href="https://x.com/kol">multi\nline</a>',
+    '<a href="">empty href</a>',
+    '<a>no href</a>',
+    'plain text',
+    '',
+    '<a href="https://a">first</a> and <a href="https://b">second</a>',
+    '<a href="https://a">unterminated',
+    'x > y</a> href="z"',
+])
+def test_parse_anchor_matches_the_regex_helpers(html):
+    assert parse_anchor(html) == (strip_a_tag(html), a_tag_link(html))
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+import combined_server
+from combined_server import CoinGeckoAPI, TokenBucket
+
+
+def test_burst_is_served_without_waiting():
+    bucket = TokenBucket(rate=1.0, burst=5)
+    assert [bucket.acquire() for _ in range(5)] == [0.0] * 5
+
+
+def test_calls_past_the_burst_wait_for_their_token():
+    bucket = TokenBucket(rate=100.0, burst=2)
+    bucket.acquire()
+    bucket.acquire()
+    started = time.monotonic()
+    waited = bucket.acquire()
+    assert 0 < waited <= 0.011
+    assert time.monotonic() - started >= waited * 0.9
+
+
+def test_concurrent_async_callers_are_spaced_by_the_rate():
+    bucket = TokenBucket(rate=200.0, burst=1)
+
+    async def scenario():
+        return await asyncio.gather(*(bucket.acquire_async() for _ in range(5)))
+
+    waits = sorted(asyncio.run(scenario()))
+    assert waits[0] == 0.0
+    for wait, expected in zip(waits[1:], (0.005, 0.01, 0.015, 0.02)):
+        assert expected - 0.002 < wait <= expected
+
+
+def test_plan_selects_only_the_rate_limit(monkeypatch):
+    monkeypatch.setattr(combined_server, "COINGECKO_API_KEY", "key")
+    client = CoinGeckoAPI()
+    assert client.base_url == "https://api.coingecko.com/api/v3"
+    assert client.headers == {"x-cg-demo-api-key": "key"}
+    assert client.rate_limiter.rate == combined_server.COINGECKO_RATE_PER_MINUTE / 60
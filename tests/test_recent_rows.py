@@ -0,0 +1,106 @@
+import asyncio
+import json
+import time
+
+import main
+from dune_rows import RecentRows, format_cursor, parse_cursor
+
+
+def buy(time: str, tx: str) -> dict:
+    return {"buy_time": time, "tx_hash": tx, "amount_usd": 100.0,
+            "kol_with_link": '<a href="https://x.com/kol">kol</a>',
+            "token_with_chart": '<a href="https://dexscreener.com/solana/Mint">TOK</a>',
+            "contract_with_chart": '<a href="https://dexscreener.com/solana/Mint">Mint</a>'}
+
+
+def test_parse_cursor_tells_a_bare_time_from_a_full_cursor():
+    assert parse_cursor("2025-06-14 10:00|tx1") == ("2025-06-14 10:00", "tx1")
+    assert parse_cursor("2025-06-14 10:00") == ("2025-06-14 10:00", None)
+    assert parse_cursor(format_cursor(("t", ""))) == ("t", "")
+
+
+def test_merge_skips_seen_rows_and_keeps_late_rows_in_order():
+    rows = RecentRows("buy_time", "tx_hash", 10)
+    assert rows.merge([buy("2", "b"), buy("1", "a")]) == 2
+    assert rows.merge([buy("2", "b"), buy("3", "c")]) == 1
+    assert rows.merge([buy("1", "a0")]) == 1
+    assert [cursor for cursor, _ in rows.latest(10)] == [("3", "c"), ("2", "b"), ("1", "a0"), ("1", "a")]
+
+
+def test_merging_the_same_result_again_is_free():
+    rows = RecentRows("buy_time", "tx_hash", 10)
+    result = [buy("1", "a")]
+    assert rows.merge(result) == 1
+    result.append(buy("2", "b"))  # Never done to a cached result; shows the list is not read again
+    assert rows.merge(result) == 0
+
+
+def test_since_pages_from_the_oldest_new_row():
+    rows = RecentRows("buy_time", "tx_hash", 10)
+    rows.merge([buy(str(i), f"tx{i}") for i in range(1, 6)])
+    page = rows.since(("2", "tx2"), 2)
+    assert [cursor for cursor, _ in page] == [("4", "tx4"), ("3", "tx3")]
+    assert [cursor for cursor, _ in rows.since(page[0][0], 0)] == [("5", "tx5")]
+    assert rows.since(("5", "tx5"), 0) == []
+
+
+def test_bare_time_skips_every_row_at_that_time():
+    rows = RecentRows("buy_time", "tx_hash", 10)
+    rows.merge([buy("1", "a"), buy("2", "a"), buy("2", "b"), buy("3", "a")])
+    assert [cursor for cursor, _ in rows.since(parse_cursor("2"), 0)] == [("3", "a")]
+    assert [cursor for cursor, _ in rows.since(parse_cursor("2|a"), 0)] == [("3", "a"), ("2", "b")]
+    assert len(rows.since(parse_cursor("0"), 0)) == 4
+
+
+def test_buffer_keeps_only_the_newest_rows():
+    rows = RecentRows("buy_time", "tx_hash", 3)
+    rows.merge([buy(str(i), "tx") for i in range(5)])
+    assert len(rows) == 3
+    assert rows.newest_cursor() == "4|tx"
+    assert RecentRows("buy_time", "tx_hash", 3).newest_cursor() == "0"
+
+
+def fresh_kol_buys(monkeypatch, store=None):
+    """An empty cache and buffer for the KOL buys query, with results restored from `store`"""
+    query_id = main.RECENT_KOL_BUYS_QUERY_ID
+    monkeypatch.setattr(main, "result_cache", main.ResultCache(16, 3600, store, main.result_cache.on_restore))
+    monkeypatch.setitem(main.ROW_BUFFERS, query_id, RecentRows("buy_time", "tx_hash", 5000))
+    return query_id
+
+
+def test_plain_tool_call_returns_the_cursor_to_poll_from(monkeypatch):
+    fresh_kol_buys(monkeypatch)
+
+    async def iter_result_pages(query_id, limit):
+        yield [buy("2", "b"), buy("1", "a")], None
+
+    monkeypatch.setattr(main, "iter_result_pages", iter_result_pages)
+    table = asyncio.run(main.get_recent_kol_buys(limit=2))
+    assert table.endswith("Next cursor: 2|b")
+    records = json.loads(asyncio.run(main.get_recent_kol_buys(limit=2, output_format="json")))
+    assert [record["cursor"] for record in records] == ["2|b", "1|a"]
+
+
+def test_restored_snapshot_is_buffered_whole_before_a_small_limit_is_served(monkeypatch, tmp_path):
+    store = main.SnapshotStore(str(tmp_path / "snapshots.sqlite3"), 1 << 24)
+    rows = [buy(f"{i:04d}", f"tx{i}") for i in reversed(range(1000))]
+    now = time.time()
+    store.save((main.RECENT_KOL_BUYS_QUERY_ID, main.RADAR_FETCH_ROWS), rows, now, now)
+    fresh_kol_buys(monkeypatch, store)
+
+    async def iter_result_pages(query_id, limit):
+        raise AssertionError("the snapshot is fresh")
+        yield
+
+    monkeypatch.setattr(main, "iter_result_pages", iter_result_pages)
+    assert asyncio.run(main.get_recent_kol_buys(limit=5)).endswith("Next cursor: 0999|tx999")
+    records = json.loads(asyncio.run(main.get_recent_kol_buys(limit=100, since="0949|tx949", output_format="json")))
+    assert [record["cursor"] for record in records] == [f"{i:04d}|tx{i}" for i in reversed(range(950, 1000))]
+
+
+def test_graduates_are_keyed_on_the_decoded_mint():
+    rows = main.ROW_BUFFERS[main.RECENT_PUMPFUN_GRADUATES_QUERY_ID]
+    row = {"graduation_time": "2025-06-14 10:00",
+           "token_address_with_chart": '<a href="https://dexscreener.com/solana/MintPump">MintPump</a>'}
+    assert rows.cursor(row) == ("2025-06-14 10:00", "MintPump")
+    assert len(rows.cursor({"graduation_time": "2025-06-14 10:00"})[1]) == 16  # Row fingerprint
@@ -0,0 +1,55 @@
+import random
+
+from tabulate import tabulate
+
+from main import render_table
+
+TEXT_ALPHABET = "abcXYZ019 .-$_()@/,\r\v"
+SPECIAL_TEXTS = ["", " ", "  padded  ", "12", "-3.5", "1e5", "True", "False", "nan", "inf",
+                 "$12.00", "ünïcode", "multi\nline", "tab\there", "None", "0x1F",
+                 "1,000", "-12,345.5", "1,00", "cr\rlf", "form\ffeed", "1,000\r"]
+
+
+def random_text(rng):
+    if rng.random() < 0.2:
+        return rng.choice(SPECIAL_TEXTS)
+    return "".join(rng.choice(TEXT_ALPHABET) for _ in range(rng.randint(0, 12)))
+
+
+def random_value(rng, is_numeric):
+    roll = rng.random()
+    if roll < 0.02:
+        return None
+    if roll < 0.04:
+        return rng.choice([1.5, True, b"bytes", -0.0])
+    if is_numeric:
+        return rng.choice([0, -1, 7, 10 ** rng.randint(0, 12), rng.randint(-10 ** 6, 10 ** 6)])
+    return random_text(rng)
+
+
+def random_table(rng):
+    numeric = [rng.random() < 0.4 for _ in range(rng.randint(1, 6))]
+    headers = [random_text(rng) or "H" for _ in numeric]
+    rows = [[random_value(rng, is_numeric) for is_numeric in numeric] for _ in range(rng.randint(0, 8))]
+    return headers, rows, numeric
+
+
+def test_render_table_matches_tabulate_on_random_tables():
+    rng = random.Random(20250614)
+    mismatches = []
+    for _ in range(5000):
+        headers, rows, numeric = random_table(rng)
+        if render_table(headers, rows, numeric) != tabulate(rows, headers=headers):
+            mismatches.append((headers, rows, numeric))
+    assert mismatches == []
+
+
+def test_render_table_matches_tabulate_on_tool_rows():
+    headers = ["Rank", "Token", "Mint Address", "Volume(12h)", "Total Trades"]
+    rows = [[i + 1, f"TOK{i}", f"Mint{i:08d}pump", f"${1e6 / (i + 1):.2f}", 10_000 - i] for i in range(1000)]
+    assert render_table(headers, rows, [True, False, False, False, True]) == tabulate(rows, headers=headers)
+
+
+def test_render_table_markdown():
+    table = render_table(["Rank", "Token"], [[1, "A|B"], [2, None]], [True, False], markdown=True)
+    assert table == "| Rank | Token |\n| ---: | --- |\n| 1 | A\\|B |\n| 2 |  |"
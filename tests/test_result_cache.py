@@ -0,0 +1,125 @@
+import asyncio
+import time
+
+import main
+from main import ResultCache
+
+
+def make_fetch(rows, ended_at=None, delay=0.0):
+    calls = []
+
+    async def fetch():
+        calls.append(time.time())
+        await asyncio.sleep(delay)
+        return rows, ended_at
+
+    return fetch, calls
+
+
+def test_fresh_entry_is_served_from_memory():
+    async def scenario():
+        cache = ResultCache(8)
+        fetch, calls = make_fetch([{"a": 1}])
+        first = await cache.get((1, 10), fetch, 60)
+        second = await cache.get((1, 10), fetch, 60)
+        return cache, first, second, calls
+
+    cache, first, second, calls = asyncio.run(scenario())
+    assert first is second
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_concurrent_misses_share_one_fetch():
+    async def scenario():
+        cache = ResultCache(8)
+        fetch, calls = make_fetch([{"a": 1}], delay=0.05)
+        results = await asyncio.gather(*(cache.get((1, 10), fetch, 60) for _ in range(10)))
+        return cache, results, calls
+
+    cache, results, calls = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(rows is results[0] for rows in results)
+    assert cache.stats()["coalesced"] == 9
+
+
+def test_least_recently_used_entry_is_evicted():
+    async def scenario():
+        cache = ResultCache(2)
+        for query_id in (1, 2, 3):
+            await cache.get((query_id, 10), make_fetch([query_id])[0], 60)
+        return cache
+
+    cache = asyncio.run(scenario())
+    assert cache.peek((1, 10)) is None
+    assert cache.peek((3, 10)) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expiry_follows_upstream_execution_time():
+    cache = ResultCache(8)
+    now = time.time()
+    entry = cache.put((1, 10), [], 300, execution_ended_at=now - 100, fetched_at=now)
+    assert entry.expires_at == now + 200
+
+
+def test_old_upstream_execution_is_kept_for_the_minimum_ttl():
+    cache = ResultCache(8)
+    now = time.time()
+    entry = cache.put((1, 10), [], 300, execution_ended_at=now - 1000, fetched_at=now)
+    assert entry.expires_at == now + main.RADAR_CACHE_MIN_TTL
+
+
+def test_unchanged_upstream_execution_backs_off_up_to_the_ttl():
+    cache = ResultCache(8)
+    ended_at = time.time() - 1000
+    delays = []
+    for fetched_at in range(10):
+        fetched_at = ended_at + 1000 + fetched_at * 1000
+        entry = cache.put((1, 10), [], 300, execution_ended_at=ended_at, fetched_at=fetched_at)
+        delays.append(round(entry.expires_at - entry.fetched_at))
+    min_ttl = main.RADAR_CACHE_MIN_TTL
+    assert delays[:4] == [min_ttl, 2 * min_ttl, 4 * min_ttl, 8 * min_ttl]
+    assert delays[-1] == 300
+
+
+def test_new_upstream_execution_resets_the_backoff():
+    cache = ResultCache(8)
+    now = time.time()
+    cache.put((1, 10), [], 300, execution_ended_at=now - 1000, fetched_at=now)
+    cache.put((1, 10), [], 300, execution_ended_at=now - 1000, fetched_at=now + 30)
+    entry = cache.put((1, 10), [], 300, execution_ended_at=now - 500, fetched_at=now + 90)
+    assert entry.expires_at == now + 90 + main.RADAR_CACHE_MIN_TTL
+
+
+def test_expired_entry_is_served_stale_while_refreshing():
+    async def scenario():
+        cache = ResultCache(8, stale_ttl=60)
+        cache.put((1, 10), ["old"], 1, fetched_at=time.time() - 10)
+        fetch, calls = make_fetch(["new"])
+        stale = await cache.get((1, 10), fetch, 1)
+        await asyncio.sleep(0.01)
+        fresh = await cache.get((1, 10), fetch, 1)
+        return cache, stale, fresh, calls
+
+    cache, stale, fresh, calls = asyncio.run(scenario())
+    assert stale == ["old"] and fresh == ["new"]
+    assert len(calls) == 1
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_failed_fetch_raises_and_is_counted():
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def scenario():
+        cache = ResultCache(8)
+        try:
+            await cache.get((1, 10), failing, 60)
+        except RuntimeError as e:
+            await asyncio.sleep(0)
+            return cache, e
+
+    cache, error = asyncio.run(scenario())
+    assert str(error) == "upstream down"
+    assert cache.stats()["failures"] == 1
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import combined_server
+
+
+def post_rpc(body, monkeypatch, handler=None):
+    """POST `body` (raw text or JSON-serializable) to /rpc and return (status, parsed body or None)"""
+    calls = []
+
+    async def handle_coingecko_method(method, params):
+        calls.append((method, params))
+        if handler is not None:
+            return await handler(method, params)
+        return {"method": method, "params": params}
+
+    monkeypatch.setattr(combined_server, "handle_coingecko_method", handle_coingecko_method)
+
+    async def scenario():
+        async with TestClient(TestServer(combined_server.create_app())) as client:
+            data = body if isinstance(body, str) else json.dumps(body)
+            response = await client.post("/rpc", data=data, headers={"Content-Type": "application/json"})
+            text = await response.text()
+            return response.status, json.loads(text) if text else None
+
+    status, response = asyncio.run(scenario())
+    return status, response, calls
+
+
+def request(request_id, method="get_trending_crypto", **params):
+    return {"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}
+
+
+def test_single_call(monkeypatch):
+    status, response, _ = post_rpc(request(1), monkeypatch)
+    assert status == 200
+    assert response == {"jsonrpc": "2.0", "id": 1, "result": {"method": "get_trending_crypto", "params": {}}}
+
+
+def test_unparseable_body_is_a_parse_error(monkeypatch):
+    status, response, _ = post_rpc('{"jsonrpc": "2.0", "method"', monkeypatch)
+    assert status == 400
+    assert response == {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": "Parse error"}}
+
+
+def test_empty_batch_is_an_invalid_request(monkeypatch):
+    status, response, _ = post_rpc([], monkeypatch)
+    assert status == 400
+    assert response["error"]["code"] == -32600
+
+
+def test_unknown_method(monkeypatch):
+    status, response, _ = post_rpc(request(1, "nope"), monkeypatch)
+    assert status == 404
+    assert response["error"]["code"] == -32601
+
+
+def test_batch_answers_in_request_order(monkeypatch):
+    async def handler(method, params):
+        await asyncio.sleep(params["delay"])
+        return params["delay"]
+
+    status, response, _ = post_rpc([request("slow", delay=0.05), request("fast", delay=0)], monkeypatch, handler)
+    assert status == 200
+    assert [(item["id"], item["result"]) for item in response] == [("slow", 0.05), ("fast", 0)]
+
+
+def test_batch_members_run_concurrently(monkeypatch):
+    async def handler(method, params):
+        await asyncio.sleep(0.2)
+        return params["n"]
+
+    started = time.perf_counter()
+    status, response, _ = post_rpc([request(n, n=n) for n in range(5)], monkeypatch, handler)
+    elapsed = time.perf_counter() - started
+    assert [item["result"] for item in response] == list(range(5))
+    assert elapsed < 0.8
+
+
+def test_identical_batch_members_share_one_call(monkeypatch):
+    _, response, calls = post_rpc([request(1, n=1), request(2, n=1), request(3, n=2)], monkeypatch)
+    assert [item["id"] for item in response] == [1, 2, 3]
+    assert len(calls) == 2
+
+
+def test_batch_notifications_get_no_response(monkeypatch):
+    notification = {"jsonrpc": "2.0", "method": "get_trending_crypto", "params": {}}
+    _, response, calls = post_rpc([notification, request(1)], monkeypatch)
+    assert [item["id"] for item in response] == [1]
+    assert len(calls) == 1
+
+
+def test_batch_of_only_notifications_returns_no_content(monkeypatch):
+    notification = {"jsonrpc": "2.0", "method": "get_trending_crypto"}
+    status, response, _ = post_rpc([notification, notification], monkeypatch)
+    assert status == 204 and response is None
+
+
+def test_invalid_batch_members_get_invalid_request_errors(monkeypatch):
+    members = [1, {"foo": 1}, {"jsonrpc": "2.0", "method": 5}, {"jsonrpc": "2.0", "method": "get_trending_crypto", "params": 3}]
+    status, response, calls = post_rpc(members, monkeypatch)
+    assert status == 200
+    assert len(response) == 4
+    assert all(item["error"]["code"] == -32600 and item["id"] is None for item in response)
+    assert calls == []
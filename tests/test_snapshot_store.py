@@ -0,0 +1,89 @@
+import asyncio
+import time
+
+import main
+from main import ResultCache, SnapshotStore
+
+
+def test_snapshot_round_trip(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"), 1 << 20)
+    rows = [{"mint": "abc", "volume": 1.5, "rank": 1}]
+    store.save((1, 1000), rows, 123.0, 100.0)
+    assert store.load((1, 1000)) == (rows, 123.0, 100.0)
+    assert store.load((2, 1000)) is None
+
+
+def test_store_drops_oldest_snapshots_over_its_cap(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"), 60_000)
+    rows = [{"payload": str(i) * 1000} for i in range(25)]
+    for query_id in range(5):
+        store.save((query_id, 1000), rows, float(query_id))
+    assert store.load((0, 1000)) is None
+    assert store.load((4, 1000)) is not None
+
+
+def test_fresh_snapshot_is_served_while_a_fetch_is_in_flight(tmp_path):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"), 1 << 20)
+    store.save((1, 1000), ["from disk"], time.time())
+
+    async def slow_fetch():
+        await asyncio.sleep(10)
+        return ["from dune"], None
+
+    async def scenario():
+        cache = ResultCache(8, store=store)
+        refresh = asyncio.ensure_future(cache.refresh((1, 1000), slow_fetch, 60))
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        rows = await cache.get((1, 1000), slow_fetch, 60)
+        elapsed = time.perf_counter() - started
+        refresh.cancel()
+        return cache, rows, elapsed
+
+    cache, rows, elapsed = asyncio.run(scenario())
+    assert rows == ["from disk"]
+    assert elapsed < 1
+    assert cache.stats()["restored_from_disk"] == 1
+
+
+def test_refresher_waits_for_a_restored_snapshot_to_expire(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"), 1 << 20)
+    query_id = main.RECENT_KOL_BUYS_QUERY_ID
+    store.save((query_id, main.RADAR_FETCH_ROWS), [{"buy_time": "t", "tx_hash": "x"}], time.time())
+    fetches = []
+
+    async def fetch_latest_result(query_id, limit):
+        fetches.append(query_id)
+        return [], None
+
+    monkeypatch.setattr(main, "result_cache", ResultCache(8, store=store))
+    monkeypatch.setattr(main, "fetch_latest_result", fetch_latest_result)
+
+    async def scenario():
+        task = asyncio.ensure_future(main.refresh_query(query_id, asyncio.Semaphore(1)))
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert fetches == []
+    assert main.result_cache.stats()["restored_from_disk"] == 1
+
+
+def test_refresher_fetches_at_once_without_a_snapshot(tmp_path, monkeypatch):
+    store = SnapshotStore(str(tmp_path / "snapshots.sqlite3"), 1 << 20)
+    fetches = []
+
+    async def fetch_latest_result(query_id, limit):
+        fetches.append(query_id)
+        return [], None
+
+    monkeypatch.setattr(main, "result_cache", ResultCache(8, store=store))
+    monkeypatch.setattr(main, "fetch_latest_result", fetch_latest_result)
+
+    async def scenario():
+        task = asyncio.ensure_future(main.refresh_query(main.KOL_TRADING_VOLUME_QUERY_ID, asyncio.Semaphore(1)))
+        await asyncio.sleep(0.2)
+        task.cancel()
+
+    asyncio.run(scenario())
+    assert fetches == [main.KOL_TRADING_VOLUME_QUERY_ID]
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import main
+
+
+def kol_buy(mint: str) -> dict:
+    return {"buy_time": "2025-06-14 10:00", "tx_hash": "tx1", "amount_usd": 100.0,
+            "kol_with_link": '<a href="https://x.com/kol">kol</a>',
+            "token_with_chart": f'<a href="https://dexscreener.com/solana/{mint}">TOK</a>',
+            "contract_with_chart": f'<a href="https://dexscreener.com/solana/{mint}">{mint}</a>'}
+
+
+def fresh_token_index(monkeypatch):
+    index = main.TokenIndex()
+    for query_id, source in main.token_index.sources.items():
+        index.add_source(query_id, source)
+    monkeypatch.setattr(main, "token_index", index)
+
+
+def test_lookup_token_lists_the_datasets_it_could_not_read(monkeypatch):
+    fresh_token_index(monkeypatch)
+    monkeypatch.setattr(main, "result_cache", main.ResultCache(64))
+
+    async def iter_result_pages(query_id, limit):
+        if query_id != main.RECENT_KOL_BUYS_QUERY_ID:
+            raise RuntimeError("Dune is down")
+        yield [kol_buy("MintPump")], None
+
+    monkeypatch.setattr(main, "iter_result_pages", iter_result_pages)
+    table = asyncio.run(main.lookup_token("MintPump"))
+    assert "## get_recent_kol_buys" in table
+    assert table.splitlines()[-1].startswith("Not checked, could not be read: ")
+    assert "get_recent_pumpfun_graduates" in table.splitlines()[-1]
+    found = json.loads(asyncio.run(main.lookup_token("MintPump", output_format="json")))
+    assert list(found["datasets"]) == ["get_recent_kol_buys"]
+    assert len(found["unavailable"]) == len(main.token_index.sources) - 1
+
+
+def test_lookup_token_returns_the_error_when_no_dataset_could_be_read(monkeypatch):
+    fresh_token_index(monkeypatch)
+
+    async def get_latest_result(query_id, limit=1000):
+        raise RuntimeError("Dune is down")
+
+    monkeypatch.setattr(main, "get_latest_result", get_latest_result)
+    assert asyncio.run(main.lookup_token("MintPump")) == "Dune is down"
+
+
+def trending_row(mint, volume: float) -> dict:
+    return {"rank": 1, "token_link": '<a href="https://dexscreener.com/solana/x">TOK</a>',
+            "token_mint_address": mint, "total_volume_usd": volume, "total_trades": 10}
+
+
+def test_combined_trending_merges_the_sources_it_could_read(monkeypatch):
+    async def get_latest_result(query_id, limit=1000):
+        if query_id == main.TRENDING_BY_SOURCE_QUERY_IDS["Telegram"]:
+            return [trending_row("MintA", 5.0), trending_row(None, 50.0), trending_row("", 40.0)]
+        if query_id == main.TRENDING_BY_SOURCE_QUERY_IDS["Web"]:
+            return [trending_row("MintA", 2.0), trending_row("MintB", 3.0)]
+        if query_id == main.RAYDIUM_QUERY_IDS["12h"]:
+            raise RuntimeError("Dune is down")
+        return []
+
+    monkeypatch.setattr(main, "get_latest_result", get_latest_result)
+    records = json.loads(asyncio.run(main.get_trending_tokens_combined(output_format="json")))
+    assert [(record["mint_address"], record["volume_usd"]) for record in records] == [("MintA", 7.0), ("MintB", 3.0)]
+    assert records[0]["missing_sources"] == ["Raydium"]
+    table = asyncio.run(main.get_trending_tokens_combined())
+    assert "Raydium" not in table.splitlines()[2]
+    assert table.endswith("Missing sources, could not be read: Raydium")
+
+
+def test_combined_trending_returns_the_error_when_no_source_could_be_read(monkeypatch):
+    async def get_latest_result(query_id, limit=1000):
+        raise RuntimeError("Dune is down")
+
+    monkeypatch.setattr(main, "get_latest_result", get_latest_result)
+    assert asyncio.run(main.get_trending_tokens_combined()) == "Dune is down"